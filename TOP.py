@@ -1,7 +1,18 @@
+import pandas as pd
 import streamlit as st
+from easy_stat.assets import prepare_assets
+
+# 列の部分集合（df[cat_var + num_vars] など）をコピーせずに参照できるようにする（Copy-on-Write）
+# 設定はプロセス全体に効くため、アプリの起動時にここで1回だけ行う（pandas 3 では常に有効）。
+# 結果は変わらないため、各ページを直接開いて未設定の場合も同じ値になる。
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 
 st.set_page_config(page_title="easyStat", layout="wide")
 
+# デモデータの変換と説明用画像の読み込み（初回のみ）
+prepare_assets()
+
 # App title and creator
 st.title("easyStat（ブラウザ統計）")
 st.caption("Created by Dit-Lab.(Daiki Ito)")
@@ -25,6 +36,7 @@ st.markdown("""- [**ｔ検定（対応あり）**]""")
 st.markdown("""- [**一要因分散分析（対応なし）**]""")
 st.markdown("""- [**単回帰分析**]""")
 st.markdown("""- [**テキストマイニング**]""")
+st.markdown("""- [**大容量データ分析**]""")
 
 # Updates and history
 st.header("更新履歴")
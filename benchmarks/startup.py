@@ -0,0 +1,61 @@
+"""各ページの初回表示までの時間を計測する
+
+ページごとに新しいプロセスを起動し、ライブラリが読み込まれていない状態での
+1回目の実行（コールド）と、同じプロセスでの2回目以降の実行（ウォーム）の時間を
+streamlit.testing の AppTest で計測する。
+
+使い方: python benchmarks/startup.py [--runs 3] [ページのファイル名のパターン ...]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子プロセスで実行するコード（streamlit 自体の import は計測に含めない）
+_CHILD = '''
+import json, os, sys, time
+root, path, runs = sys.argv[1], sys.argv[2], int(sys.argv[3])
+os.chdir(root)
+sys.path.insert(0, root)
+from streamlit.testing.v1 import AppTest
+times = []
+errors = []
+for _ in range(runs):
+    at = AppTest.from_file(path, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - start)
+    errors = [e.message.splitlines()[0] for e in at.exception]
+print(json.dumps({'times': times, 'errors': errors}))
+'''
+
+
+def measure(path, runs):
+    result = subprocess.run(
+        [sys.executable, '-c', _CHILD, ROOT, path, str(runs)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('patterns', nargs='*', default=['*.py'])
+    parser.add_argument('--runs', type=int, default=3, help='1ページあたりの実行回数（2回目以降がウォーム）')
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.patterns for path in glob.glob(os.path.join(ROOT, 'pages', pattern))})
+    print(f'{"page":<40} {"cold [s]":>10} {"warm [s]":>10}  error')
+    for path in paths:
+        result = measure(path, max(args.runs, 2))
+        cold, warm = result['times'][0], min(result['times'][1:])
+        error = result['errors'][0] if result['errors'] else ''
+        print(f'{os.path.basename(path):<40} {cold:>10.3f} {warm:>10.3f}  {error}')
+
+
+if __name__ == '__main__':
+    main()
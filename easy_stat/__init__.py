@@ -0,0 +1 @@
+# easyStat の各ページから共通で利用する処理をまとめたパッケージ
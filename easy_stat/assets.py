@@ -0,0 +1,66 @@
+import glob
+import io
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+import streamlit as st
+from PIL import Image
+
+from easy_stat.loader import CACHE_DIR, optimize_dtypes
+
+# デモデータを変換したファイルの保存先
+ASSET_CACHE_DIR = os.path.join(CACHE_DIR, 'assets')
+DEMO_DATA_PATTERN = '*_demo.xlsx'
+IMAGE_PATTERN = '*.png'
+
+# st.image は透過のない画像を JPEG に変換して送信するため、あらかじめ同じ形式にしておく
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 90
+
+
+def _converted_path(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(ASSET_CACHE_DIR, f'{stem}.feather')
+
+
+def convert_demo_data(path):
+    """デモデータの Excel ファイルを Feather 形式に変換し、変換後のパスを返す
+
+    変換済みのファイルが元のファイルより新しい場合は変換しない。
+    """
+    converted = _converted_path(path)
+    if not os.path.exists(converted) or os.path.getmtime(converted) < os.path.getmtime(path):
+        df = optimize_dtypes(pd.read_excel(path, sheet_name=0))
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{converted}.{os.getpid()}.tmp'
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, converted)
+    return converted
+
+
+@st.cache_resource(show_spinner=False)
+def load_demo_data(path):
+    """デモデータを読み込む（プロセス全体で共有するため、破壊的に変更しないこと）"""
+    return feather.read_table(convert_demo_data(path), memory_map=True).to_pandas()
+
+
+@st.cache_resource(show_spinner=False)
+def load_image(path):
+    """説明用の画像を、st.image がそのまま送信できる形式のバイト列にして返す"""
+    with Image.open(path) as image:
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, format=IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def show_image(path):
+    st.image(load_image(path), output_format=IMAGE_FORMAT)
+
+
+def prepare_assets():
+    """デモデータの変換と画像の読み込みを済ませておく（アプリの起動時に呼び出す）"""
+    for path in sorted(glob.glob(DEMO_DATA_PATTERN)):
+        load_demo_data(path)
+    for path in sorted(glob.glob(IMAGE_PATTERN)):
+        load_image(path)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from easy_stat.streaming import GroupedMoments, Moments
+
+
+class GroupCube:
+    """カテゴリ変数（1つ・2つの組み合わせ）の水準ごとの、数値変数の有効N・平均値・偏差平方和
+
+    集計は表示で使うカテゴリ変数（の組み合わせ）・数値変数ごとに、はじめて使われたときに
+    np.bincount で求めて保持する（使われない組み合わせは集計しない）。
+    クロス表・群ごとの平均値・t検定や分散分析に必要な集計は、この結果の切り出しで求める。
+    """
+
+    def __init__(self, df, categorical_cols, numerical_cols):
+        self.df = df
+        self.categorical_cols = list(categorical_cols)
+        self.numerical_cols = list(numerical_cols)
+        self.levels = {}
+        self._codes = {}
+        # カテゴリ変数の組ごとの (セルの番号, 水準ごとの行数)
+        self._cells = {}
+        # (カテゴリ変数の組, 数値変数) ごとの (有効N, 平均値, 偏差平方和)
+        self._stats = {}
+
+    def _column_codes(self, col):
+        """カテゴリ変数の水準の番号（欠損値は -1）"""
+        if col not in self._codes:
+            self._codes[col], self.levels[col] = pd.factorize(self.df[col], sort=True)
+        return self._codes[col]
+
+    def _key(self, cols):
+        """cols の集計に使うカテゴリ変数の組（逆順の組を集計済みならそれを使う）"""
+        cols = tuple(cols)
+        return cols[::-1] if cols not in self._cells and cols[::-1] in self._cells else cols
+
+    def _cell_rows(self, key):
+        """行ごとのセルの番号（どれかのカテゴリ変数が欠損値の行は -1）と、セルごとの行数"""
+        if key not in self._cells:
+            cell = self._column_codes(key[0]).astype(np.int64)
+            for col in key[1:]:
+                other = self._column_codes(col)
+                cell = np.where((cell >= 0) & (other >= 0), cell * len(self.levels[col]) + other, -1)
+            size = int(np.prod([len(self.levels[col]) for col in key]))
+            self._cells[key] = cell, np.bincount(cell[cell >= 0], minlength=size)
+        return self._cells[key]
+
+    def _column_stats(self, key, num_col):
+        """セルごとの数値変数の有効N・平均値・偏差平方和（平均値を求めてから偏差の二乗を集計する）"""
+        if (key, num_col) not in self._stats:
+            cell, rows = self._cell_rows(key)
+            values = self.df[num_col].to_numpy(dtype=float)
+            used = (cell >= 0) & ~np.isnan(values)
+            cell, values = cell[used], values[used]
+            n = np.bincount(cell, minlength=len(rows))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.bincount(cell, values, minlength=len(rows)) / n
+            m2 = np.bincount(cell, (values - mean[cell]) ** 2, minlength=len(rows))
+            self._stats[key, num_col] = n, mean, m2
+        return self._stats[key, num_col]
+
+    def _lookup(self, cols, num_col=None):
+        """cols の順に軸を並べた、行数 (水準, ...) と、数値変数の有効N・平均値・偏差平方和 (水準, ...) の配列"""
+        cols = tuple(cols)
+        key = self._key(cols)
+        _, rows = self._cell_rows(key)
+        stats = [] if num_col is None else list(self._column_stats(key, num_col))
+        shape = [len(self.levels[col]) for col in key]
+        arrays = [array.reshape(shape) for array in [rows] + stats]
+        if key != cols:
+            arrays = [array.T for array in arrays]
+        return arrays
+
+    def crosstab(self, col1, col2):
+        """pd.crosstab(df[col1], df[col2]) と同じクロス表"""
+        rows, = self._lookup((col1, col2))
+        table = pd.DataFrame(rows, index=pd.Index(self.levels[col1], name=col1),
+                             columns=pd.Index(self.levels[col2], name=col2))
+        return table.loc[rows.sum(axis=1) > 0, rows.sum(axis=0) > 0]
+
+    def level_counts(self, col):
+        """カテゴリ変数の水準ごとの行数（欠損値の行は数えない）"""
+        rows, = self._lookup((col,))
+        return pd.Series(rows, index=pd.Index(self.levels[col], name=col))
+
+    def summary(self, cols, num_col):
+        """カテゴリ変数（1つ・2つ）の水準ごとの、数値変数の有効N・平均値・標準偏差
+
+        cols はカテゴリ変数のリスト（1つのときも [col] と指定する）。
+        df.groupby(cols, observed=True)[num_col] と同じく、行のある水準（の組み合わせ）のみを返す。
+        """
+        cols = list(cols)
+        rows, n, mean, m2 = self._lookup(cols, num_col)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        index = pd.MultiIndex.from_product([self.levels[col] for col in cols], names=cols)
+        table = pd.DataFrame({
+            "有効N": n.ravel().astype('int64'),
+            "平均値": mean.ravel(),
+            "標準偏差": std.ravel(),
+        }, index=index if len(cols) > 1 else index.get_level_values(0))
+        return table[rows.ravel() > 0]
+
+    def grouped_moments(self, col, num_cols=None):
+        """カテゴリ変数の水準ごとの Moments（welch_ttest_moments・GroupedMoments.anova で検定できる）
+
+        num_cols を省略するとすべての数値変数を集計する。最小値・最大値は集計していないため NaN になる。
+        """
+        num_cols = self.numerical_cols if num_cols is None else list(num_cols)
+        rows, = self._lookup((col,))
+        stats = [self._lookup((col,), num_col)[1:] for num_col in num_cols]
+        n, mean, m2 = (np.stack(stat, axis=1) for stat in zip(*stats))
+        grouped = GroupedMoments(col, num_cols)
+        for i, level in enumerate(self.levels[col]):
+            if rows[i] == 0:
+                continue
+            moments = Moments(num_cols)
+            moments.n = n[i]
+            moments.mean = np.nan_to_num(mean[i])
+            moments.m2 = m2[i]
+            moments.min = np.full(len(num_cols), np.nan)
+            moments.max = np.full(len(num_cols), np.nan)
+            grouped.groups[level] = moments
+        return grouped
+
+
+def group_cube(df, categorical_cols, numerical_cols):
+    """GroupCube を作成する（dataset.cached で使う。集計は使われたカテゴリ変数の組ごとに行う）"""
+    return GroupCube(df, categorical_cols, numerical_cols)
@@ -0,0 +1,13 @@
+# 統計処理（Streamlit に依存しない計算部分）
+from easy_stat.engine.anova import (OneWayAnovaResult, TukeyResult, TwoWayAnovaResult, one_way_anova,
+                                    tukey_hsd, two_way_anova)
+from easy_stat.engine.chisquare import (ChiSquareResult, ExactTestResult, chi_square, chi_square_exact,
+                                        chi_square_screening)
+from easy_stat.engine.common import significance, significance_labels
+from easy_stat.engine.correlation import (CORRELATION_METHODS, CorrelationResult, correlation, correlation_strength,
+                                         correlation_strengths)
+from easy_stat.engine.descriptive import (BOX_MAX_OUTLIERS, SUMMARY_COLUMNS, BoxSummary, box_summary, histogram,
+                                          summarize)
+from easy_stat.engine.regression import RegressionResult, linear_regression
+from easy_stat.engine.ttest import (PairedTTestResult, WelchTTestResult, paired_ttest, welch_ttest,
+                                    welch_ttest_moments)
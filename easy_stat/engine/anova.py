@@ -0,0 +1,220 @@
+import functools
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from easy_stat.engine.common import significance_labels
+from easy_stat.lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+special = lazy_import('scipy.special')
+smf = lazy_import('statsmodels.formula.api')
+sm_anova = lazy_import('statsmodels.stats.anova')
+
+# スチューデント化された範囲の分布の数値積分に使う Gauss-Legendre の節点と重み
+_CHI_NODES, _CHI_WEIGHTS = np.polynomial.legendre.leggauss(64)
+_NORMAL_NODES, _NORMAL_WEIGHTS = np.polynomial.legendre.leggauss(128)
+# k 個の標準正規分布の範囲の分布関数を計算する格子の点数と上限
+_RANGE_GRID_POINTS = 4096
+_RANGE_GRID_MAX = 40.0
+
+
+@dataclass
+class OneWayAnovaResult:
+    """一要因分散分析（対応なし）の結果"""
+    group_col: str
+    groups: list
+    group_sizes: dict
+    table: pd.DataFrame
+
+
+@dataclass
+class TukeyResult:
+    """Tukey の HSD 法による多重比較の結果"""
+    group_col: str
+    value_col: str
+    table: pd.DataFrame
+    _pvalues: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # 群の組み合わせ → p-adj の対応（順序を問わず引けるよう両方向を登録する）
+        self._pvalues = {}
+        for group1, group2, p_adj in self.table[['group1', 'group2', 'p-adj']].itertuples(index=False):
+            self._pvalues[(group1, group2)] = p_adj
+            self._pvalues[(group2, group1)] = p_adj
+
+    def pvalue(self, group1, group2):
+        """2群の組み合わせに対する調整済み p 値（p-adj）。比較していない組み合わせは NaN"""
+        return self._pvalues.get((group1, group2), np.nan)
+
+
+@dataclass
+class TwoWayAnovaResult:
+    """二要因分散分析（対応なし）の結果"""
+    factors: list
+    value_col: str
+    table: pd.DataFrame
+
+
+def _group_moments(codes, values, k):
+    """群ごとの件数・合計・二乗和（十分統計量）を np.bincount で計算する（欠損値は除く）"""
+    valid = ~np.isnan(values)
+    if valid.all():
+        counts = np.bincount(codes, minlength=k).astype(float)
+    else:
+        codes, values = codes[valid], values[valid]
+        counts = np.bincount(codes, minlength=k).astype(float)
+    sums = np.bincount(codes, weights=values, minlength=k)
+    squares = np.bincount(codes, weights=values * values, minlength=k)
+    return counts, sums, squares
+
+
+def one_way_anova(df, group_col, value_cols):
+    """一要因分散分析（対応なし）を数値変数ごとに行う
+
+    カテゴリ変数を一度だけ factorize し、群ごとの件数・合計・二乗和から
+    すべての数値変数の F値・p値・効果量を計算する。
+    """
+    value_cols = list(value_cols)
+    codes, groups = pd.factorize(df[group_col])
+    groups = groups.tolist()
+    k = len(groups)
+
+    # カテゴリ変数が欠損している行は除く
+    has_group = codes >= 0
+    if not has_group.all():
+        df = df[has_group]
+        codes = codes[has_group]
+
+    # 群 × 数値変数の十分統計量（桁落ちを防ぐため、数値変数ごとの平均で中心化してから集計する）
+    counts = np.empty((k, len(value_cols)))
+    sums = np.empty_like(counts)
+    squares = np.empty_like(counts)
+    centers = np.zeros(len(value_cols))
+    for j, col in enumerate(value_cols):
+        values = df[col].to_numpy(dtype=float)
+        if len(values) and not np.isnan(values).all():
+            centers[j] = np.nanmean(values)
+        counts[:, j], sums[:, j], squares[:, j] = _group_moments(codes, values - centers[j], k)
+
+    n = counts.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        overall_mean = sums.sum(axis=0) / n
+
+        # 群ごとの偏差平方和
+        group_ss = np.maximum(squares - sums * means, 0)
+        group_ss[counts == 0] = 0
+        stds = np.sqrt(group_ss / (counts - 1))
+
+        ss_within = group_ss.sum(axis=0)
+        ss_between = (counts * (np.nan_to_num(means) - overall_mean) ** 2).sum(axis=0)
+        ss_total = ss_between + ss_within
+        overall_std = np.sqrt(ss_total / (n - 1))
+
+        df_between = (counts > 0).sum(axis=0) - 1
+        df_within = n - df_between - 1
+        ms_within = ss_within / df_within
+        fval = (ss_between / df_between) / ms_within
+
+        # 効果量の計算
+        eta_squared = ss_between / ss_total
+        omega_squared = (ss_between - (df_between * ms_within)) / (ss_total + ms_within)
+    pval = stats.f.sf(fval, df_between, df_within)
+
+    means = means + centers
+    table = {'全体M': overall_mean + centers, '全体S.D': overall_std}
+    for i, group in enumerate(groups):
+        table[f'{group}M'] = means[i]
+        table[f'{group}S.D'] = stds[i]
+    table.update({
+        'df': df_within.astype(int),
+        'F': fval,
+        'p': pval,
+        'sign': significance_labels(pval),
+        'η²': eta_squared,
+        'ω²': omega_squared,
+    })
+
+    group_sizes = {group: int((codes == i).sum()) for i, group in enumerate(groups)}
+    return OneWayAnovaResult(group_col, groups, group_sizes, pd.DataFrame(table, index=value_cols))
+
+
+def _range_cdf(w, k):
+    """k 個の標準正規分布に従う値の範囲が w 未満となる確率"""
+    z = 8 * _NORMAL_NODES
+    weights = 8 * _NORMAL_WEIGHTS * np.exp(-z ** 2 / 2) / np.sqrt(2 * np.pi)
+    inner = np.clip(special.ndtr(z) - special.ndtr(z - np.asarray(w)[..., None]), 0, 1) ** (k - 1)
+    return k * (inner * weights).sum(axis=-1)
+
+
+def _studentized_range_sf(q, k, dof):
+    """スチューデント化された範囲の分布の上側確率（q は配列）
+
+    scipy.stats.studentized_range.sf は値ごとに数値積分を行うため、水準数が多いと
+    組み合わせの数に比例して時間がかかる。ここでは範囲の分布関数を格子上で一度だけ
+    計算し、χ分布についての積分をすべての q について配列演算でまとめて行う。
+    """
+    q = np.asarray(q, dtype=float)
+    u = (_CHI_NODES + 1) / 2
+    s = np.sqrt(stats.chi2.ppf(u, dof) / dof)
+    w = q[..., None] * s
+    grid = np.linspace(0, min(max(w.max(initial=0), 1), _RANGE_GRID_MAX), _RANGE_GRID_POINTS)
+    cdf = np.interp(w, grid, _range_cdf(grid, k))
+    return np.clip(1 - (cdf * _CHI_WEIGHTS / 2).sum(axis=-1), 0, 1)
+
+
+@functools.lru_cache(maxsize=64)
+def _studentized_range_ppf(p, k, dof):
+    # 同じ群分けでは数値変数が変わっても同じ値になるため、結果を保持する
+    return stats.studentized_range.ppf(p, k, dof)
+
+
+def tukey_hsd(df, group_col, value_col, alpha=0.05):
+    """Tukey の HSD 法による多重比較
+
+    すべての群の組み合わせ k(k-1)/2 組の平均値の差・標準誤差・調整済み p 値・
+    信頼区間を配列演算でまとめて計算する（表の形式は statsmodels の
+    pairwise_tukeyhsd と同じ）。
+    """
+    data = df[[group_col, value_col]].dropna()
+    codes, groups = pd.factorize(data[group_col], sort=True)
+    groups = np.asarray(groups, dtype=object)
+    k = len(groups)
+    values = data[value_col].to_numpy(dtype=float)
+
+    counts = np.bincount(codes, minlength=k)
+    means = np.bincount(codes, weights=values, minlength=k) / counts
+    residuals = values - means[codes]
+    dof = len(values) - k
+    mse = residuals @ residuals / dof
+
+    i, j = np.triu_indices(k, 1)
+    meandiff = means[j] - means[i]
+    std_err = np.sqrt(mse / 2 * (1 / counts[i] + 1 / counts[j]))
+    p_adj = _studentized_range_sf(np.abs(meandiff) / std_err, k, dof)
+
+    # 信頼区間の幅（有意水準 alpha に対応する q の臨界値）
+    q_crit = _studentized_range_ppf(1 - alpha, k, dof)
+    margin = q_crit * std_err
+
+    table = pd.DataFrame({
+        'group1': groups[i],
+        'group2': groups[j],
+        'meandiff': meandiff.round(4),
+        'p-adj': p_adj.round(4),
+        'lower': (meandiff - margin).round(4),
+        'upper': (meandiff + margin).round(4),
+        'reject': np.abs(meandiff) > margin,
+    })
+    return TukeyResult(group_col, value_col, table)
+
+
+def two_way_anova(df, factors, value_col):
+    """二要因分散分析（対応なし）（タイプIIの平方和）"""
+    # 変数名が日本語や特殊文字を含む場合に備えて Q() で囲む
+    formula = f'Q("{value_col}") ~ C(Q("{factors[0]}")) + C(Q("{factors[1]}")) + C(Q("{factors[0]}")):C(Q("{factors[1]}"))'
+    model = smf.ols(formula, df).fit()
+    table = sm_anova.anova_lm(model, typ=2)
+    return TwoWayAnovaResult(list(factors), value_col, table)
@@ -0,0 +1,198 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from easy_stat.engine.common import significance_labels
+from easy_stat.lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+
+# モンテカルロ法を複数のプロセスに分けて行うシミュレーション回数の下限
+# （これより少ない場合は、プロセスの起動の時間がシミュレーションの時間を上回る）
+PARALLEL_MIN_SIMULATIONS = 200_000
+# モンテカルロ法で1回にまとめて作成する表の、ラベルの数（表の数 × 総度数）の上限
+# （int64 で約 32 MB。総度数が大きい表ほど、1回にまとめる表の数を減らす）
+SIMULATION_BATCH_ELEMENTS = 4_000_000
+
+
+@dataclass
+class ChiSquareResult:
+    """カイ２乗検定の結果（各表の行・列はクロス表と同じ）
+
+    residuals はピアソン残差 (観測度数 - 期待度数) / √期待度数、adjusted_residuals は
+    調整済み残差で、significant は調整済み残差が有意水準に対応する z 値を超えるセル。
+    """
+    observed: pd.DataFrame
+    expected: pd.DataFrame
+    contributions: pd.DataFrame
+    residuals: pd.DataFrame
+    adjusted_residuals: pd.DataFrame
+    significant: pd.DataFrame
+    chi2: float
+    p_value: float
+    dof: int
+
+
+@dataclass
+class ExactTestResult:
+    """正確検定（2×2 の表は Fisher の正確確率検定、それ以外はモンテカルロ法）の結果
+
+    std_error はモンテカルロ法の p 値の標準誤差（Fisher の正確確率検定では 0）。
+    """
+    method: str
+    p_value: float
+    std_error: float
+    n_simulations: int
+
+
+def chi_square(df, col1, col2, alpha=0.05):
+    """2つのカテゴリ変数のクロス表に対するカイ２乗検定"""
+    observed = pd.crosstab(df[col1], df[col2])
+    chi2, p_value, dof, expected = stats.chi2_contingency(observed)
+    expected = pd.DataFrame(expected, index=observed.index, columns=observed.columns)
+
+    # (観測度数 - 期待度数)^2 / 期待度数
+    contributions = (observed - expected) ** 2 / expected
+    residuals = (observed - expected) / np.sqrt(expected)
+
+    # 調整済み残差（行・列の周辺度数の割合で補正した残差で、標準正規分布に従う）
+    n = observed.to_numpy().sum()
+    row_ratio = observed.sum(axis=1).to_numpy() / n
+    col_ratio = observed.sum(axis=0).to_numpy() / n
+    adjusted_residuals = residuals / np.sqrt(np.outer(1 - row_ratio, 1 - col_ratio))
+    # 調整済み残差が有意水準に対応する z 値を超えるセルを有意とする
+    significant = adjusted_residuals.abs() > stats.norm.ppf(1 - alpha / 2)
+
+    return ChiSquareResult(observed, expected, contributions, residuals, adjusted_residuals, significant,
+                           chi2, p_value, dof)
+
+
+def _contingency_stats(observed):
+    """クロス表（度数の配列）からカイ２乗値・自由度・p 値・クラメールの V などを計算する"""
+    # 度数が0の行・列（完全なデータに現れない水準）は除く
+    observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+    n = observed.sum()
+    rows, cols = observed.shape
+    dof = (rows - 1) * (cols - 1)
+    if dof == 0:
+        return rows, cols, n, np.nan, dof, np.nan, np.nan, np.nan
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    chi2 = ((observed - expected) ** 2 / expected).sum()
+    cramers_v = np.sqrt(chi2 / (n * min(rows - 1, cols - 1)))
+    if dof == 1:
+        # scipy.stats.chi2_contingency と同じく、2×2 の表では Yates の補正を行う
+        diff = expected - observed
+        corrected = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+        chi2 = ((corrected - expected) ** 2 / expected).sum()
+    sparse_ratio = (expected < 5).mean()
+    return rows, cols, n, chi2, dof, cramers_v, sparse_ratio, expected.min()
+
+
+def chi_square_screening(df, cols):
+    """カテゴリ変数のすべての組み合わせについてカイ２乗検定を行い、クラメールの V の大きい順に並べる
+
+    各列を一度だけ整数コードに変換し、2列のコードを組み合わせた値を np.bincount で
+    数えてクロス表を作成する。期待度数が5未満のセルが2割を超えるか、1未満のセルがある
+    組み合わせは「度数不足」とする（カイ２乗近似の精度が低いため）。
+    """
+    cols = list(cols)
+    codes = {}
+    for col in cols:
+        col_codes, levels = pd.factorize(df[col])
+        codes[col] = (col_codes, len(levels))
+
+    rows = []
+    for i, col1 in enumerate(cols):
+        codes1, k1 = codes[col1]
+        for col2 in cols[i + 1:]:
+            codes2, k2 = codes[col2]
+            # どちらかが欠損している行は除く
+            valid = (codes1 >= 0) & (codes2 >= 0)
+            combined = codes1[valid] * k2 + codes2[valid]
+            observed = np.bincount(combined, minlength=k1 * k2).reshape(k1, k2)
+            rows.append((col1, col2) + _contingency_stats(observed))
+
+    table = pd.DataFrame(rows, columns=['変数1', '変数2', '水準数1', '水準数2', 'N', 'χ²', '自由度',
+                                        'クラメールのV', '期待度数5未満の割合', '最小期待度数'])
+    table['p'] = stats.chi2.sf(table['χ²'], table['自由度'])
+    table['sign'] = significance_labels(table['p'])
+    table['度数不足'] = (table['期待度数5未満の割合'] > 0.2) | (table['最小期待度数'] < 1)
+    table = table[['変数1', '変数2', '水準数1', '水準数2', 'N', 'χ²', '自由度', 'p', 'sign',
+                   'クラメールのV', '期待度数5未満の割合', '度数不足']]
+    return table.sort_values('クラメールのV', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _chi2_statistics(tables, expected):
+    """(シミュレーション回数, 行数, 列数) のクロス表の配列に対するカイ２乗値"""
+    return ((tables - expected) ** 2 / expected).sum(axis=(-2, -1))
+
+
+def _simulate_chi2(row_labels, col_labels, shape, expected, batches):
+    """周辺度数を固定したランダムなクロス表を作成し、カイ２乗値の配列を返す
+
+    列の水準のラベルを並べ替える（行との対応をランダムにする）ことで、行・列の合計を
+    保ったまま表を作成する。batches は (表の数, シード) のリストで、バッチごとに
+    その数の表をまとめて np.bincount で数える。
+    """
+    rows, cols = shape
+    results = []
+    for size, seed in batches:
+        rng = np.random.default_rng(seed)
+        permuted = rng.permuted(np.broadcast_to(col_labels, (size, len(col_labels))), axis=1)
+        # 表ごとに別の範囲のコードになるように、表の番号 × セル数 を足して数える
+        combined = row_labels * cols + permuted + (np.arange(size) * rows * cols)[:, None]
+        tables = np.bincount(combined.ravel(), minlength=size * rows * cols).reshape(size, rows, cols)
+        results.append(_chi2_statistics(tables, expected))
+    return np.concatenate(results)
+
+
+def chi_square_exact(observed, n_simulations=10_000, seed=None, workers=1, batch_size=None):
+    """期待度数が小さい表のための p 値（2×2 は Fisher の正確確率検定、それ以外はモンテカルロ法）
+
+    モンテカルロ法では、周辺度数を固定したランダムな表を n_simulations 個作成し、観測された
+    カイ２乗値以上となる割合を p 値とする（(1 + 該当数) / (1 + n_simulations)）。
+    1回にまとめて作成する表の数（batch_size）は、既定では SIMULATION_BATCH_ELEMENTS と総度数から決める。
+    workers が2以上で n_simulations が PARALLEL_MIN_SIMULATIONS 以上の場合は、
+    バッチを複数のプロセスに分けて行う（workers=None は CPU 数）。バッチごとにシードを
+    分けるため、seed が同じなら workers によらず同じ p 値になる。
+    """
+    observed = np.asarray(observed, dtype=np.int64)
+    if observed.shape == (2, 2):
+        _, p_value = stats.fisher_exact(observed)
+        return ExactTestResult('Fisher の正確確率検定', p_value, 0.0, 0)
+
+    n = observed.sum()
+    rows, cols = observed.shape
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    statistic = _chi2_statistics(observed, expected)
+
+    # 観測された表を1行ずつのラベル（行の水準・列の水準）に展開する
+    row_labels = np.repeat(np.arange(rows), observed.sum(axis=1))
+    col_labels = np.concatenate([np.repeat(np.arange(cols), observed[i]) for i in range(rows)])
+
+    if batch_size is None:
+        batch_size = max(1, SIMULATION_BATCH_ELEMENTS // max(int(n), 1))
+    sizes = [min(batch_size, n_simulations - start) for start in range(0, n_simulations, batch_size)]
+    batches = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if n_simulations < PARALLEL_MIN_SIMULATIONS:
+        workers = 1
+    workers = min(workers, len(batches))
+    args = (row_labels, col_labels, (rows, cols), expected)
+    if workers == 1:
+        simulated = _simulate_chi2(*args, batches)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_simulate_chi2, *args, batches[i::workers]) for i in range(workers)]
+            simulated = np.concatenate([future.result() for future in futures])
+
+    # 浮動小数点の誤差で同じ値の表を取りこぼさないよう、わずかに小さい値と比較する
+    count = (simulated >= statistic * (1 - 1e-7)).sum()
+    p_value = (1 + count) / (1 + n_simulations)
+    std_error = np.sqrt(p_value * (1 - p_value) / n_simulations)
+    return ExactTestResult('モンテカルロ法', p_value, std_error, n_simulations)
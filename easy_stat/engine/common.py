@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def significance(p):
+    """p値から判定記号（**, *, †, n.s.）を返す"""
+    if p < 0.01:
+        return '**'
+    if p < 0.05:
+        return '*'
+    if p < 0.1:
+        return '†'
+    return 'n.s.'
+
+
+def significance_labels(p):
+    """p値の配列から判定記号の配列を返す（significance のベクトル版）"""
+    p = np.asarray(p, dtype=float)
+    return np.select([p < 0.01, p < 0.05, p < 0.1], ['**', '*', '†'], default='n.s.')
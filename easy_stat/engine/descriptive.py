@@ -0,0 +1,124 @@
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_COLUMNS = ["有効N", "平均値", "中央値", "標準偏差", "分散", "最小値", "最大値"]
+# ヒストグラムの階級数の上限
+HISTOGRAM_MAX_BINS = 200
+# 箱ひげ図に表示する外れ値の数の上限（変数ごと）
+BOX_MAX_OUTLIERS = 1_000
+
+# groupby().agg() の集計名と要約統計量の列名の対応
+_AGGREGATIONS = {
+    'count': "有効N",
+    'mean': "平均値",
+    'median': "中央値",
+    'std': "標準偏差",
+    'var': "分散",
+    'min': "最小値",
+    'max': "最大値",
+}
+
+
+def _summary(values, index):
+    """(行数, 列数) の配列から要約統計量の表を作成する（欠損値は除く）"""
+    n = (~np.isnan(values)).sum(axis=0)
+    # 欠損値のみの列では NaN を返す（警告は表示しない）
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        var = np.nanvar(values, axis=0, ddof=1)
+        return pd.DataFrame({
+            "有効N": n.astype('int64'),
+            "平均値": np.nanmean(values, axis=0),
+            "中央値": np.nanmedian(values, axis=0),
+            "標準偏差": np.sqrt(var),
+            "分散": var,
+            "最小値": np.nanmin(values, axis=0) if len(values) else np.full(len(index), np.nan),
+            "最大値": np.nanmax(values, axis=0) if len(values) else np.full(len(index), np.nan),
+        }, index=index)
+
+
+def summarize(df, cols, by=None):
+    """数値変数ごとの要約統計量（有効N・平均値・中央値・標準偏差・分散・最小値・最大値）
+
+    選択された列を一つの配列にまとめ、列方向の集計で一度に計算する。
+    by にカテゴリ変数を指定すると、(群, 数値変数) を index とする群ごとの表を返す。
+    有効N は int64、それ以外は float64 の列になる。
+    """
+    cols = list(dict.fromkeys(cols))
+    if by is None:
+        return _summary(df[cols].to_numpy(dtype=float), pd.Index(cols))
+
+    grouped = df[cols].astype(float).groupby(df[by], observed=True, sort=False)
+    table = grouped.agg(list(_AGGREGATIONS))
+    # (数値変数, 集計) の列を (群, 数値変数) の行に並べ替える
+    table = pd.concat({col: table[col] for col in cols}).swaplevel(0, 1)
+    table = table.reindex(pd.MultiIndex.from_product([grouped.size().index, cols], names=[by, None]))
+    return table.rename(columns=_AGGREGATIONS).astype({"有効N": 'int64'})
+
+
+@dataclass
+class BoxSummary:
+    """箱ひげ図の要約（四分位数・ひげ・外れ値）
+
+    table は変数ごとの 最小値・下ひげ・第1四分位数・中央値・第3四分位数・上ひげ・最大値・外れ値の数、
+    outliers は変数ごとの外れ値（中央値から遠い順に最大 max_outliers 個）。
+    """
+    table: pd.DataFrame
+    outliers: dict
+
+
+def histogram(df, col, max_bins=HISTOGRAM_MAX_BINS):
+    """数値変数のヒストグラムの度数と階級の境界（欠損値は除く）
+
+    階級数は np.histogram_bin_edges の 'auto' で決め、max_bins を上限とする。
+    """
+    values = df[col].to_numpy(dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    edges = np.histogram_bin_edges(values, bins='auto')
+    if len(edges) - 1 > max_bins:
+        edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def box_summary(df, cols, max_outliers=BOX_MAX_OUTLIERS):
+    """数値変数ごとの箱ひげ図の要約（四分位数は線形補間、ひげは四分位範囲の1.5倍以内の最小値・最大値）"""
+    cols = list(dict.fromkeys(cols))
+    values = df[cols].to_numpy(dtype=float)
+    if len(values) == 0:
+        # 行がない場合は欠損値のみの1行として計算する（すべて NaN になる）
+        values = np.full((1, len(cols)), np.nan)
+    valid = ~np.isnan(values)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        q1, median, q3 = np.nanpercentile(values, [25, 50, 75], axis=0)
+        iqr = q3 - q1
+        inside = valid & (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+        lower = np.where(inside, values, np.inf).min(axis=0)
+        upper = np.where(inside, values, -np.inf).max(axis=0)
+        outside = valid & ~inside
+        table = pd.DataFrame({
+            "最小値": np.nanmin(values, axis=0),
+            "下ひげ": np.where(np.isfinite(lower), lower, np.nan),
+            "第1四分位数": q1,
+            "中央値": median,
+            "第3四分位数": q3,
+            "上ひげ": np.where(np.isfinite(upper), upper, np.nan),
+            "最大値": np.nanmax(values, axis=0),
+            "外れ値の数": outside.sum(axis=0).astype('int64'),
+        }, index=pd.Index(cols))
+
+    outliers = {}
+    for i, col in enumerate(cols):
+        points = values[outside[:, i], i]
+        if len(points) > max_outliers:
+            # 中央値から遠い外れ値を優先して残す
+            distance = np.abs(points - median[i])
+            points = points[np.argpartition(-distance, max_outliers)[:max_outliers]]
+        outliers[col] = points
+    return BoxSummary(table, outliers)
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class RegressionResult:
+    """線形回帰（最小二乗法）の結果
+
+    features は回帰に使った説明変数の行列（標準化した場合は標準化後の値）。
+    """
+    feature_cols: list
+    target_col: str
+    coef: np.ndarray
+    intercept: float
+    features: np.ndarray
+    predictions: np.ndarray
+    r_squared: float
+
+
+def linear_regression(df, feature_cols, target_col, standardize=False):
+    """単回帰・重回帰分析"""
+    features = df[feature_cols].to_numpy(dtype=float)
+    target = df[target_col].to_numpy(dtype=float)
+
+    if standardize:
+        # StandardScaler と同様に、分散が0の列はそのまま（平均を引くだけ）にする
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1
+        features = (features - features.mean(axis=0)) / scale
+
+    design = np.column_stack([np.ones(len(features)), features])
+    solution, *_ = np.linalg.lstsq(design, target, rcond=None)
+    intercept, coef = solution[0], solution[1:]
+    predictions = design @ solution
+
+    ss_res = ((target - predictions) ** 2).sum()
+    ss_tot = ((target - target.mean()) ** 2).sum()
+    r_squared = 1 - ss_res / ss_tot
+
+    return RegressionResult(list(feature_cols), target_col, coef, intercept, features, predictions, r_squared)
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from easy_stat.engine.common import significance_labels
+from easy_stat.lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+
+
+@dataclass
+class WelchTTestResult:
+    """t検定（対応なし）の結果"""
+    group_col: str
+    groups: list
+    group_sizes: dict
+    table: pd.DataFrame
+
+
+@dataclass
+class PairedTTestResult:
+    """t検定（対応あり）の結果（table の index は「観測変数 → 測定変数」）"""
+    pairs: list
+    table: pd.DataFrame
+
+
+def _column_stats(values):
+    """列ごとの有効N・平均値・不偏分散（欠損値は除く）"""
+    n = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=0) / n
+        var = np.nansum((values - mean) ** 2, axis=0) / (n - 1)
+    return n, mean, var
+
+
+def _welch_table(groups, value_cols, overall, stats0, stats1):
+    """全体・2群それぞれの (有効N, 平均値, 不偏分散) から t検定（対応なし）の表を作る"""
+    n, mean, var = overall
+    n0, mean0, var0 = stats0
+    n1, mean1, var1 = stats1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se0 = var0 / n0
+        se1 = var1 / n1
+        t = (mean0 - mean1) / np.sqrt(se0 + se1)
+        welch_df = (se0 + se1) ** 2 / (se0 ** 2 / (n0 - 1) + se1 ** 2 / (n1 - 1))
+        std = np.sqrt(var)
+        d = np.abs(mean0 - mean1) / std
+    p = 2 * stats.t.sf(np.abs(t), welch_df)
+
+    return pd.DataFrame({
+        '全体M': mean,
+        '全体S.D': std,
+        f'{groups[0]}M': mean0,
+        f'{groups[0]}S.D': np.sqrt(var0),
+        f'{groups[1]}M': mean1,
+        f'{groups[1]}S.D': np.sqrt(var1),
+        'df': n - 1,
+        't': np.abs(t),
+        'p': p,
+        'sign': significance_labels(p),
+        'd': d,
+    }, index=value_cols)
+
+
+def welch_ttest(df, group_col, value_cols):
+    """2群の平均値の差の検定（Welch の t 検定）を数値変数ごとに行う
+
+    データを一度だけ2群に分け、すべての数値変数の平均値・分散・t値・自由度・p値を
+    配列演算でまとめて計算する。
+    """
+    groups = df[group_col].unique().tolist()
+    if len(groups) != 2:
+        raise ValueError(f'{group_col} は2群ではありません（{len(groups)}群）')
+
+    value_cols = list(value_cols)
+    values = df[value_cols].to_numpy(dtype=float)
+    labels = df[group_col].to_numpy()
+    mask0 = labels == groups[0]
+    mask1 = labels == groups[1]
+
+    table = _welch_table(groups, value_cols, _column_stats(values),
+                         _column_stats(values[mask0]), _column_stats(values[mask1]))
+    group_sizes = {groups[0]: int(mask0.sum()), groups[1]: int(mask1.sum())}
+    return WelchTTestResult(group_col, groups, group_sizes, table)
+
+
+def welch_ttest_moments(grouped, groups, group_sizes):
+    """群ごとの Moments（GroupedMoments）から welch_ttest と同じ検定を行う
+
+    GroupCube.grouped_moments の集計を使い、データを読み直さずに検定する。
+    全体の平均値・偏差平方和は2群の値を結合して求める。
+    """
+    groups = list(groups)
+    if len(groups) != 2:
+        raise ValueError(f'{grouped.group_col} は2群ではありません（{len(groups)}群）')
+
+    g0, g1 = (grouped.groups[group] for group in groups)
+    n = g0.n + g1.n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (g0.n * g0.mean + g1.n * g1.mean) / n
+        m2 = g0.m2 + g1.m2 + (g1.mean - g0.mean) ** 2 * g0.n * g1.n / n
+        var = np.where(n > 1, m2 / (n - 1), np.nan)
+    stats0, stats1 = ((g.n, np.where(g.n > 0, g.mean, np.nan), g.var) for g in (g0, g1))
+
+    table = _welch_table(groups, grouped.columns, (n, mean, var), stats0, stats1)
+    group_sizes = {group: int(group_sizes[group]) for group in groups}
+    return WelchTTestResult(grouped.group_col, groups, group_sizes, table)
+
+
+def paired_ttest(df, pre_vars, post_vars):
+    """対応のある2変数の平均値の差の検定をペアごとに行う
+
+    観測変数と測定変数をそれぞれ行列にまとめ、差の平均値・標準偏差から
+    すべてのペアの t値・p値・効果量を配列演算でまとめて計算する。
+    """
+    if len(pre_vars) != len(post_vars):
+        raise ValueError('観測変数と測定変数の数が一致しません')
+
+    pairs = list(zip(pre_vars, post_vars))
+    pre = df[list(pre_vars)].to_numpy(dtype=float)
+    post = df[list(post_vars)].to_numpy(dtype=float)
+
+    # ペアのどちらかが欠損している行は除く
+    missing = np.isnan(pre) | np.isnan(post)
+    pre = np.where(missing, np.nan, pre)
+    post = np.where(missing, np.nan, post)
+
+    n, pre_mean, pre_var = _column_stats(pre)
+    _, post_mean, post_var = _column_stats(post)
+    _, diff_mean, diff_var = _column_stats(pre - post)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = diff_mean / np.sqrt(diff_var / n)
+        # 効果量 d（2変数の標準偏差をプールしたもので差を割る）
+        d = np.abs((pre_mean - post_mean) / np.sqrt((pre_var + post_var) / 2))
+    p = 2 * stats.t.sf(np.abs(t), n - 1)
+
+    table = pd.DataFrame({
+        '観測値M': pre_mean,
+        '観測値S.D': np.sqrt(pre_var),
+        '測定値M': post_mean,
+        '測定値S.D': np.sqrt(post_var),
+        'df': n - 1,
+        't': np.abs(t),
+        'p': p,
+        'sign': significance_labels(p),
+        'd': d,
+    }, index=[f'{pre_var} → {post_var}' for pre_var, post_var in pairs])
+
+    return PairedTTestResult(pairs, table)
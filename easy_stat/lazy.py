@@ -0,0 +1,46 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """属性に初めてアクセスしたときに import されるモジュール
+
+    plotly や statsmodels などの重いライブラリを、実際に使う処理（「実行」ボタンを
+    押した後など）まで読み込まないようにするために使う。
+    """
+
+    def __init__(self, name, requires=()):
+        super().__init__(name)
+        self._lazy_requires = tuple(requires)
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            module = importlib.import_module(self.__name__)
+            # japanize_matplotlib など、import するだけで設定が反映されるモジュール
+            for name in self._lazy_requires:
+                importlib.import_module(name)
+            self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return f'<lazy module {self.__name__!r} ({state})>'
+
+
+def lazy_import(name, requires=()):
+    """モジュールを遅延 import する（読み込み済みの場合はそのモジュールを返す）
+
+    例: plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
+    """
+    module = sys.modules.get(name)
+    if module is not None and all(required in sys.modules for required in requires):
+        return module
+    return LazyModule(name, requires)
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# アップロードを受け付けるファイル形式（st.file_uploader の type に渡す）
+SUPPORTED_TYPES = ['xlsx', 'csv', 'parquet', 'feather']
+
+# キャッシュの上限（件数とメモリ使用量のどちらかを超えたら古いものから破棄）
+MAX_CACHE_ENTRIES = 16
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# 異なる値の数が行数に対してこの割合以下の文字列の列は category 型に変換する
+CATEGORY_MAX_RATIO = 0.5
+
+# メモリから追い出したデータは Feather（Arrow IPC）形式でディスクに退避し、
+# 次回はファイルを解析し直さずにメモリマップで読み込む
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'easy_stat_cache')
+MAX_DISK_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class DataFrameCache:
+    """ファイル内容のハッシュをキーに DataFrame を保持する LRU キャッシュ"""
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES, max_bytes=MAX_CACHE_BYTES,
+                 spill_dir=None, max_spill_bytes=MAX_DISK_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        df = self._restore(key)
+        if df is not None:
+            self.put(key, df)
+        return df
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            # 上限を超える単独のデータはメモリに保持しない
+            if size > self.max_bytes:
+                evicted.append((key, df))
+            else:
+                self._entries[key] = (df, size)
+                self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                evicted_key, (evicted_df, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                evicted.append((evicted_key, evicted_df))
+        # ディスクへの書き込みはロックの外で行う
+        for evicted_key, evicted_df in evicted:
+            self._spill(evicted_key, evicted_df)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f'{key}.feather')
+
+    def _spill(self, key, df):
+        # 列名が文字列でないデータは Arrow への変換で列名が変わるため退避しない
+        if self.spill_dir is None or not all(isinstance(col, str) for col in df.columns):
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except (ValueError, TypeError, pa.ArrowException):
+            # Arrow に変換できない型を含むデータは退避しない
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune_spill_dir()
+
+    def _restore(self, key):
+        if self.spill_dir is None:
+            return None
+        path = self._spill_path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, pa.ArrowException):
+            return None
+        os.utime(path)
+        return table.to_pandas()
+
+    def _prune_spill_dir(self):
+        # 最終利用日時が古いファイルから削除する
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith('.feather'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_spill_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# プロセス全体（全セッション）で共有するキャッシュ
+_cache = DataFrameCache(spill_dir=CACHE_DIR)
+
+
+def _file_format(name):
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+
+def _parse(data, file_format):
+    if file_format == 'csv':
+        return pd.read_csv(io.BytesIO(data))
+    if file_format == 'parquet':
+        return pq.read_table(pa.BufferReader(data)).to_pandas()
+    if file_format == 'feather':
+        return feather.read_table(pa.BufferReader(data)).to_pandas()
+    return pd.read_excel(io.BytesIO(data), sheet_name=0)
+
+
+def _smallest_int_dtype(series):
+    # 2つの値の差や積（2乗）が元の型の範囲に収まる最小の整数型を選ぶ
+    max_abs = max(abs(int(series.min())), abs(int(series.max())))
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_abs ** 2 <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _is_text(series):
+    """文字列の列かどうか（object 型と、pandas 3 で既定になった str 型。category 型は除く）"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def optimize_dtypes(df):
+    """読み込み直後のデータの型をメモリ効率の良いものに変換する
+
+    - 異なる値の少ない文字列の列を category 型に変換する
+    - 整数の列を、値の差や2乗がオーバーフローしない範囲で小さな整数型に変換する
+
+    変換前後のメモリ使用量は df.attrs['memory_usage'] に記録する。
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    df = df.copy(deep=False)
+    # 列名が重複していても処理できるよう、位置で列を参照する
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if _is_text(series):
+            n_unique = series.nunique()
+            if 0 < n_unique <= CATEGORY_MAX_RATIO * len(series):
+                df.isetitem(i, series.astype('category'))
+        elif pd.api.types.is_signed_integer_dtype(series.dtype) and len(series) > 0:
+            dtype = _smallest_int_dtype(series)
+            if dtype != series.dtype:
+                df.isetitem(i, series.astype(dtype))
+    df.attrs['memory_usage'] = {'before': before, 'after': int(df.memory_usage(deep=True).sum())}
+    return df
+
+
+def file_key(data, name):
+    """ファイル内容と形式からキャッシュのキーを作る"""
+    return f'{hashlib.sha256(data).hexdigest()}.{_file_format(name)}'
+
+
+def load_bytes(data, name, key=None):
+    """バイト列を DataFrame に変換する（同じ内容のファイルはキャッシュから返す）
+
+    返り値はセッション間で共有されるため、呼び出し側で破壊的に変更しないこと。
+    """
+    if key is None:
+        key = file_key(data, name)
+    df = _cache.get(key)
+    if df is None:
+        df = optimize_dtypes(_parse(data, _file_format(name)))
+        _cache.put(key, df)
+    return df
+
+
+def load_uploaded_file(uploaded_file):
+    """st.file_uploader で受け取ったファイルを読み込む"""
+    if uploaded_file is None:
+        return None
+    return load_bytes(uploaded_file.getvalue(), uploaded_file.name)
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# グラフに描く点の数の上限（これを超える場合は点を抽出する）
+DEFAULT_MAX_POINTS = 10_000
+# 抽出する点のうち、外れ値に割り当てる割合
+OUTLIER_RATIO = 0.1
+# 外れ値とみなすロバストな z 値（中央値と MAD から計算）
+OUTLIER_Z = 3.5
+# 散布図の層（x, y の格子）の1辺の数
+GRID_BINS = 20
+# 外れ値の判定に使う中央値・MAD を計算する行数の上限（これを超える場合はランダムに抽出した行で計算する）
+ROBUST_SCALE_ROWS = 100_000
+
+
+@dataclass
+class PointSample:
+    """グラフに描く行の抽出結果
+
+    index は描く行の位置（昇順）、total は欠損値を除いた行数、outliers は index に含まれる外れ値の数。
+    """
+    index: np.ndarray
+    total: int
+    outliers: int
+
+    @property
+    def drawn(self):
+        return len(self.index)
+
+    @property
+    def sampled(self):
+        return self.drawn < self.total
+
+    @property
+    def note(self):
+        """グラフに描いた点の数の説明"""
+        if not self.sampled:
+            return f'{self.total:,}点をすべて表示しています'
+        return f'{self.total:,}点のうち{self.drawn:,}点（外れ値{self.outliers:,}点を含む）を抽出して表示しています'
+
+
+def _robust_z(values, rng):
+    """列ごとの中央値と MAD（正規分布で標準偏差に一致するよう 1.4826 倍）による z 値の絶対値の最大値"""
+    subset = values
+    if len(values) > ROBUST_SCALE_ROWS:
+        subset = values[rng.choice(len(values), ROBUST_SCALE_ROWS, replace=False)]
+    median = np.median(subset, axis=0)
+    mad = 1.4826 * np.median(np.abs(subset - median), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.abs(values - median) / mad
+    # MAD が 0 の列は、中央値と異なる値をすべて外れ値とする
+    z = np.where(mad > 0, z, np.where(values != median, np.inf, 0))
+    return z.max(axis=1)
+
+
+def sample_points(values, max_points=DEFAULT_MAX_POINTS, strata=None, seed=0):
+    """(行数, 列数) の配列から、グラフに描く行を最大 max_points 行（+層の数）抽出する
+
+    ロバストな z 値の大きい外れ値を優先して残し（最大 max_points の OUTLIER_RATIO）、
+    残りは層（strata: 行ごとの層の番号）の大きさに比例した数を層ごとにランダムに抽出する。
+    層ごとの抽出は層の中でのランダムな並べ替えの先頭を取る方法で、リザーバーサンプリングと同じ分布になる。
+    空でない層からは少なくとも1点を抽出する。欠損値を含む行は除く。
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    rows = np.flatnonzero(~np.isnan(values).any(axis=1))
+    if len(rows) <= max_points:
+        return PointSample(rows, len(rows), 0)
+
+    rng = np.random.default_rng(seed)
+
+    # 外れ値（z 値の大きい順に最大 max_points * OUTLIER_RATIO 行）
+    z = _robust_z(values[rows], rng)
+    n_outliers = min(int(max_points * OUTLIER_RATIO), int((z > OUTLIER_Z).sum()))
+    outliers = np.argpartition(-z, n_outliers)[:n_outliers] if n_outliers else np.zeros(0, dtype=np.intp)
+    is_rest = np.ones(len(rows), dtype=bool)
+    is_rest[outliers] = False
+    rest = np.flatnonzero(is_rest)
+
+    # 層ごとの抽出数（層の大きさに比例、空でない層は1点以上）
+    codes = np.zeros(len(rest), dtype=np.intp) if strata is None else np.asarray(strata)[rows][rest]
+    counts = np.bincount(codes)
+    budget = max_points - n_outliers
+    quota = np.minimum(counts, np.maximum(counts > 0, np.floor(budget * counts / len(rest)).astype(np.intp)))
+
+    # ランダムに並べ替えてから層の順に安定ソートし、層ごとに先頭の quota 個を選ぶ
+    # （層の数が 65536 未満の場合は uint16 の基数ソートになる）
+    shuffled = rng.permutation(len(rest))
+    keys = codes[shuffled].astype(np.uint16) if len(counts) < 2 ** 16 else codes[shuffled]
+    by_stratum = shuffled[np.argsort(keys, kind='stable')]
+    sorted_codes = codes[by_stratum]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    position = np.arange(len(rest)) - starts[sorted_codes]
+    chosen = rest[by_stratum[position < quota[sorted_codes]]]
+
+    index = np.sort(np.concatenate([rows[outliers], rows[chosen]]))
+    return PointSample(index, len(rows), n_outliers)
+
+
+def grid_strata(x, y, bins=GRID_BINS):
+    """x, y の範囲を bins × bins の格子に分けたときの、行ごとの格子の番号（散布図の層に使う）"""
+    codes = []
+    for values in (x, y):
+        values = np.asarray(values, dtype=float)
+        low, high = np.nanmin(values), np.nanmax(values)
+        scaled = (values - low) / (high - low) * bins if high > low else np.zeros(len(values))
+        codes.append(np.clip(np.nan_to_num(scaled), 0, bins - 1).astype(np.intp))
+    return codes[0] * bins + codes[1]
+
+
+def sample_scatter(df, x, y, max_points=DEFAULT_MAX_POINTS):
+    """散布図に描く行の抽出（x, y の格子を層とし、外れ値を残す）"""
+    values = df[[x, y]].to_numpy(dtype=float)
+    return sample_points(values, max_points, strata=grid_strata(values[:, 0], values[:, 1]))
+
+
+def density_grid(x, y, bins=100):
+    """散布図の代わりに描く2次元の度数（np.histogram2d、欠損値は除く）"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return np.histogram2d(x[valid], y[valid], bins=bins)
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+from easy_stat.assets import load_demo_data
+from easy_stat.loader import file_key, load_bytes
+from easy_stat.sketch import MAX_LEVELS, lump_frame
+
+# st.session_state に保存する際のキー
+_DATASETS_KEY = 'easy_stat_datasets'
+_ACTIVE_KEY = 'easy_stat_active_dataset'
+# 利用中のデータセットを登録したアップロード（再実行のたびにファイル全体をハッシュしないため）
+_UPLOAD_KEY = 'easy_stat_active_upload'
+
+# データセットごとに保持する計算結果（表・グラフなど）の数の上限（古いものから捨てる）
+MAX_RESULTS = 32
+
+
+@dataclass
+class Dataset:
+    """読み込み済みのデータと、その列の種類（カテゴリ変数・数値変数）"""
+    name: str
+    key: str
+    df: object
+    _categorical_cols: tuple = field(repr=False)
+    _numerical_cols: tuple = field(repr=False)
+    _results: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    # with_top_levels で水準をまとめたカテゴリ変数
+    lumped_cols: tuple = ()
+
+    @classmethod
+    def from_frame(cls, name, key, df):
+        categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+        numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns
+        return cls(name, key, df, tuple(categorical_cols), tuple(numerical_cols))
+
+    # ページ側でリストを書き換えても共有データに影響しないよう、毎回新しいリストを返す
+    @property
+    def categorical_cols(self):
+        return list(self._categorical_cols)
+
+    @property
+    def numerical_cols(self):
+        return list(self._numerical_cols)
+
+    def cached(self, func, *args):
+        """func(df, *args) の結果をデータセットごとに保持して返す
+
+        多重比較など、同じページの表とグラフや再実行のたびに同じ計算を繰り返さないために使う。
+        args はハッシュ可能な値（列名など）にすること。
+        """
+        key = (func.__module__, func.__qualname__) + args
+        return self._remember(key, lambda: func(self.df, *args))
+
+    def _remember(self, key, compute):
+        """計算結果を保持して返す（最近使った MAX_RESULTS 個まで）"""
+        if key in self._results:
+            self._results.move_to_end(key)
+        else:
+            self._results[key] = compute()
+            while len(self._results) > MAX_RESULTS:
+                self._results.popitem(last=False)
+        return self._results[key]
+
+    def with_top_levels(self, max_levels=MAX_LEVELS):
+        """水準が max_levels 個を超えるカテゴリ変数を、出現回数の上位 max_levels 水準と「その他」にまとめたデータセット
+
+        グラフ・クロス表・群分けで使う。まとめる列がなければ自身を返す（計算結果の保持も共有する）。
+        """
+        def lump():
+            df, lumped_cols = lump_frame(self.df, self._categorical_cols, max_levels)
+            return self if not lumped_cols else Dataset(
+                self.name, f'{self.key}:top{max_levels}', df,
+                self._categorical_cols, self._numerical_cols, lumped_cols=tuple(lumped_cols))
+
+        return self._remember(('with_top_levels', max_levels), lump)
+
+    @property
+    def memory_usage(self):
+        """読み込み時の型の最適化の前後のメモリ使用量（バイト）"""
+        usage = self.df.attrs.get('memory_usage')
+        if usage is None:
+            after = int(self.df.memory_usage(deep=True).sum())
+            return after, after
+        return usage['before'], usage['after']
+
+
+def _datasets():
+    return st.session_state.setdefault(_DATASETS_KEY, {})
+
+
+def _register(data, name, activate):
+    key = file_key(data, name)
+    datasets = _datasets()
+    dataset = datasets.get(key)
+    if dataset is None:
+        dataset = Dataset.from_frame(name, key, load_bytes(data, name, key))
+        datasets[key] = dataset
+    if activate:
+        # アップロードされたデータセットは利用中の1つだけをセッションに残す
+        # （データ本体は loader のキャッシュが保持するため、同じファイルは再度解析しない）
+        for old_key in [old_key for old_key in datasets if old_key != key and not old_key.startswith('demo:')]:
+            del datasets[old_key]
+        st.session_state[_ACTIVE_KEY] = key
+    return dataset
+
+
+def _upload_id(uploaded_file):
+    """アップロードを識別する値（file_id がない古い Streamlit ではファイル名と大きさ）"""
+    file_id = getattr(uploaded_file, 'file_id', None)
+    return file_id if file_id is not None else (uploaded_file.name, uploaded_file.size)
+
+
+def get_dataset(uploaded_file=None):
+    """アップロードされたファイルをセッションに登録し、利用中のデータセットを返す
+
+    ファイルが渡されなかった場合は、他のページでアップロード済みのデータセットを返す。
+    """
+    if uploaded_file is not None:
+        upload_id = _upload_id(uploaded_file)
+        key = st.session_state.get(_ACTIVE_KEY)
+        if st.session_state.get(_UPLOAD_KEY) == upload_id and key in _datasets():
+            dataset = _datasets()[key]
+        else:
+            dataset = _register(uploaded_file.getvalue(), uploaded_file.name, activate=True)
+            st.session_state[_UPLOAD_KEY] = upload_id
+    else:
+        key = st.session_state.get(_ACTIVE_KEY)
+        if key is None:
+            return None
+        dataset = _datasets()[key]
+        st.caption(f'アップロード済みのデータ（{dataset.name}）を使用しています')
+
+    before, after = dataset.memory_usage
+    st.caption(f'メモリ使用量： {after / 1024 ** 2:.1f} MB（読み込み時の型の最適化により {(before - after) / 1024 ** 2:.1f} MB 削減）')
+    return dataset
+
+
+def get_demo_dataset(path):
+    """デモデータのデータセットを返す（利用中のデータセットは切り替えない）"""
+    key = f'demo:{path}'
+    datasets = _datasets()
+    dataset = datasets.get(key)
+    if dataset is None:
+        dataset = Dataset.from_frame(path, key, load_demo_data(path))
+        datasets[key] = dataset
+    return dataset
+
+
+def clear_dataset():
+    st.session_state.pop(_UPLOAD_KEY, None)
+    key = st.session_state.pop(_ACTIVE_KEY, None)
+    if key is not None:
+        _datasets().pop(key, None)
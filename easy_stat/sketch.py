@@ -0,0 +1,348 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from easy_stat.streaming import Moments
+
+# 1回に集計する行数
+DEFAULT_CHUNKSIZE = 100_000
+# 要約統計量の分位点（df.describe() と同じ）
+QUANTILES = (0.25, 0.5, 0.75)
+# グラフ・クロス表・群分けに使うカテゴリ変数の水準の数の上限（超える場合は上位の水準と「その他」にまとめる）
+MAX_LEVELS = 30
+OTHER_LABEL = 'その他'
+
+
+class QuantileSketch:
+    """分位点を近似する KLL スケッチ（チャンク単位で結合できる）
+
+    レベル h の値は 2^h 個分の重みを持つ。レベルが容量を超えると、並べ替えて1つおきに
+    上のレベルへ移す（どちらの1つおきかはランダム）。保持する値の数は約 3k 個で、
+    全体の行数には依存しない。
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        """順位（0〜1）の誤差の上限（99%の確率、Apache DataSketches の経験式）"""
+        # まだ圧縮していない場合はすべての値を保持しているため、誤差はない
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        # 上のレベルほど容量が大きい（最上位が k、1つ下がるごとに 2/3 倍）
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        self.n += other.n
+        for level, values in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if len(values) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                values = np.sort(values)
+                # 個数が奇数の場合は1つをこのレベルに残す
+                keep = values[:len(values) % 2]
+                values = values[len(values) % 2:]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], values[self._rng.integers(2)::2]])
+                self.levels[level] = keep
+                # レベルが増えると下のレベルの容量が変わるため、最初から確認する
+                level = 0
+                continue
+            level += 1
+
+    def quantile(self, q):
+        """q（0〜1、配列可）に対応する値の近似値"""
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, np.clip(q, 0, 1) * cumulative[-1], side='left')
+        return values[order][np.minimum(index, len(values) - 1)]
+
+    def quantile_bounds(self, q):
+        """q に対応する値の範囲（順位の誤差を考慮した下限・上限）"""
+        q = np.asarray(q, dtype=float)
+        return self.quantile(q - self.rank_error), self.quantile(q + self.rank_error)
+
+
+def _bit_length(x):
+    """uint64 の配列の各要素のビット長"""
+    length = np.zeros(x.shape, dtype=np.uint64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        upper = x >> np.uint64(shift)
+        has_upper = upper > 0
+        length += has_upper * np.uint64(shift)
+        x = np.where(has_upper, upper, x)
+    return length + (x > 0)
+
+
+class DistinctCountSketch:
+    """異なり数（ユニーク数）を近似する HyperLogLog（チャンク単位で結合できる）
+
+    値のハッシュの先頭 p ビットでレジスタを選び、残りのビットの先頭の 0 の個数の最大値を
+    記録する。メモリは 2^p バイトで、相対誤差（標準誤差）は約 1.04 / √(2^p)。
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if len(values) == 0:
+            return
+        hashed = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        index = (hashed >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashed << np.uint64(self.p)
+        # 残りのビットの先頭の 0 の個数 + 1（すべて 0 の場合は 64 - p + 1）
+        rank = np.minimum(65 - _bit_length(rest), 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        # 推定値が小さい場合は、空のレジスタの割合から推定する（Linear Counting）
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+
+class TopValuesSketch:
+    """出現回数の多い値を近似する Space-Saving（チャンク単位で結合できる）
+
+    最大 capacity 個の値について、出現回数の上限 counts と誤差 errors を保持する。
+    記録していない値の出現回数は floor 以下で、counts - errors は出現回数の下限になる。
+    """
+
+    def __init__(self, capacity=1_000):
+        self.capacity = capacity
+        self.n = 0
+        self.floor = 0
+        self.counts = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        # category 型では出現しない水準も 0 回として数えられるため除く
+        self.update_counts(counts[counts > 0])
+
+    def update_counts(self, counts):
+        """値ごとの出現回数（値を index とする Series）を追加する"""
+        other = TopValuesSketch(self.capacity)
+        other.counts = counts
+        other.errors = pd.Series(0, index=other.counts.index, dtype='int64')
+        other.n = int(other.counts.sum())
+        other._trim()
+        self.merge(other)
+
+    def merge(self, other):
+        index = self.counts.index.union(other.counts.index, sort=False)
+        self.counts = (self.counts.reindex(index, fill_value=self.floor)
+                       + other.counts.reindex(index, fill_value=other.floor))
+        self.errors = (self.errors.reindex(index, fill_value=self.floor)
+                       + other.errors.reindex(index, fill_value=other.floor))
+        self.floor += other.floor
+        self.n += other.n
+        self._trim()
+        return self
+
+    def _trim(self):
+        if len(self.counts) <= self.capacity:
+            return
+        order = np.argsort(-self.counts.to_numpy(), kind='stable')
+        dropped = order[self.capacity:]
+        self.floor = max(self.floor, int(self.counts.iloc[dropped].max()))
+        self.counts = self.counts.iloc[order[:self.capacity]]
+        self.errors = self.errors.loc[self.counts.index]
+
+    @property
+    def max_error(self):
+        """出現回数の誤差の上限"""
+        return int(self.errors.max()) if len(self.errors) else 0
+
+    def top(self, k=None):
+        """出現回数（上限）の多い順に並べた値と出現回数の上限・下限"""
+        table = pd.DataFrame({'上限': self.counts, '下限': self.counts - self.errors})
+        table = table.sort_values('上限', ascending=False, kind='stable')
+        return table if k is None else table.head(k)
+
+
+class Profile:
+    """データを1回読み通す間に、スケッチを使って要約統計量を近似する
+
+    件数・平均値・標準偏差・最小値・最大値は厳密に、分位点（KLL）・ユニーク数（HyperLogLog）・
+    最頻値と度数（Space-Saving）は近似で計算する。
+    """
+
+    def __init__(self, numerical_cols, categorical_cols, k=200, p=14, capacity=1_000):
+        self.numerical_cols = list(numerical_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.moments = Moments(self.numerical_cols)
+        self.quantiles = {col: QuantileSketch(k) for col in self.numerical_cols}
+        self.counts = {col: 0 for col in self.categorical_cols}
+        self.distinct = {col: DistinctCountSketch(p) for col in self.categorical_cols}
+        self.top_values = {col: TopValuesSketch(capacity) for col in self.categorical_cols}
+
+    def update(self, chunk):
+        values = chunk[self.numerical_cols].to_numpy(dtype=float)
+        self.moments.update(values)
+        for i, col in enumerate(self.numerical_cols):
+            self.quantiles[col].update(values[:, i])
+        for col in self.categorical_cols:
+            # ハッシュの計算はチャンクごとに1回だけ行い、異なり数はチャンク内のユニークな値から求める
+            codes, uniques = pd.factorize(chunk[col])
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            self.counts[col] += int(counts.sum())
+            self.distinct[col].update(uniques)
+            self.top_values[col].update_counts(pd.Series(counts, index=uniques))
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        for col in self.numerical_cols:
+            self.quantiles[col].merge(other.quantiles[col])
+        for col in self.categorical_cols:
+            self.counts[col] += other.counts[col]
+            self.distinct[col].merge(other.distinct[col])
+            self.top_values[col].merge(other.top_values[col])
+        return self
+
+    def to_frame(self, columns=None):
+        """df.describe(include='all').transpose() と同じ形式の要約統計量（近似値を含む）"""
+        numeric = self.moments.to_frame()
+        rows = {}
+        for col in self.categorical_cols:
+            top = self.top_values[col].top(1)
+            rows[col] = {
+                'count': self.counts[col],
+                'unique': round(self.distinct[col].estimate()),
+                'top': top.index[0] if len(top) else None,
+                'freq': top['上限'].iloc[0] if len(top) else np.nan,
+            }
+        for col in self.numerical_cols:
+            q25, q50, q75 = self.quantiles[col].quantile(QUANTILES)
+            moments = numeric.loc[col]
+            rows[col] = {
+                'count': moments['有効N'], 'mean': moments['平均値'], 'std': moments['標準偏差'],
+                'min': moments['最小値'], '25%': q25, '50%': q50, '75%': q75, 'max': moments['最大値'],
+            }
+        columns = columns if columns is not None else self.categorical_cols + self.numerical_cols
+        return pd.DataFrame.from_dict(rows, orient='index').reindex(
+            index=[col for col in columns if col in rows],
+            columns=['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+        )
+
+    def error_bounds(self):
+        """近似値の誤差の目安
+
+        分位点は値の範囲（順位の誤差 ±ε に対応する値）、ユニーク数は相対誤差（標準誤差）、
+        最頻値の度数は出現回数の誤差の上限。
+        """
+        rows = {}
+        for col in self.categorical_cols:
+            rows[col] = {
+                'ユニーク数の相対誤差': self.distinct[col].relative_error,
+                '度数の誤差上限': self.top_values[col].max_error,
+            }
+        for col in self.numerical_cols:
+            sketch = self.quantiles[col]
+            lower, upper = sketch.quantile_bounds(QUANTILES)
+            rows[col] = {'分位点の順位誤差': sketch.rank_error}
+            for q, low, high in zip(QUANTILES, lower, upper):
+                rows[col][f'{q:.0%}の範囲'] = f'{low:.4g} 〜 {high:.4g}'
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def top_levels(values, k=MAX_LEVELS, chunksize=DEFAULT_CHUNKSIZE):
+    """出現回数の多い水準（最大 k 個）と、水準が k 個を超えるかどうか
+
+    Space-Saving（容量は k の10倍）でデータを1回読み通して求める。
+    """
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype) and len(values.cat.categories) <= k:
+        return list(values.cat.categories), False
+    sketch = TopValuesSketch(capacity=10 * k)
+    for start in range(0, len(values), chunksize):
+        sketch.update(values.iloc[start:start + chunksize])
+    return list(sketch.top(k).index), len(sketch.counts) > k
+
+
+def lump_levels(values, levels):
+    """levels 以外の水準を OTHER_LABEL にまとめた category 型の Series（水準は名前順、最後が OTHER_LABEL）"""
+    values = pd.Series(values)
+    levels = sorted((level for level in levels if level != OTHER_LABEL), key=str)
+    lumped = values.astype(object).where(values.isin(levels) | values.isna(), OTHER_LABEL)
+    return pd.Series(pd.Categorical(lumped, categories=levels + [OTHER_LABEL]), index=values.index, name=values.name)
+
+
+def lump_frame(df, cols, k=MAX_LEVELS):
+    """cols のうち水準が k 個を超える列を、出現回数の上位 k 水準と OTHER_LABEL にまとめる
+
+    まとめた列を置き換えたデータフレームと、まとめた列名のリストを返す（該当する列がなければ df をそのまま返す）。
+    """
+    # df.assign(**kwargs) は文字列以外の列名を扱えないため、コピーに列ごとに代入する
+    out, lumped = df, []
+    for col in cols:
+        levels, truncated = top_levels(df[col], k)
+        if truncated:
+            if out is df:
+                out = df.copy()
+            out[col] = lump_levels(df[col], levels)
+            lumped.append(col)
+    return out, lumped
+
+
+def lumped_note(cols, k=MAX_LEVELS):
+    """lump_frame でまとめた列の説明"""
+    return f'水準の多いカテゴリ変数（{"・".join(map(str, cols))}）は、出現回数の上位{k}水準以外を「{OTHER_LABEL}」にまとめています'
+
+
+
+def profile(df, numerical_cols, categorical_cols, chunksize=DEFAULT_CHUNKSIZE):
+    """データフレームを chunksize 行ずつ集計し、Profile を作成する（dataset.cached で使う）
+
+    作業用のメモリは chunksize とスケッチの大きさで決まり、全体の行数には依存しない。
+    """
+    result = Profile(numerical_cols, categorical_cols)
+    for start in range(0, len(df), chunksize):
+        result.update(df.iloc[start:start + chunksize])
+    return result
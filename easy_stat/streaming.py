@@ -0,0 +1,394 @@
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from easy_stat.engine.correlation import CorrelationResult
+from easy_stat.lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+# easy_stat.sketch は Moments を使うため、循環 import にならないよう遅延 import する
+sketch = lazy_import('easy_stat.sketch')
+
+# 1回に読み込む行数
+DEFAULT_CHUNKSIZE = 100_000
+# 列の種類を判定するために先頭から読み込む行数
+INFER_ROWS = 1_000
+
+
+class Moments:
+    """列ごとの件数・平均・偏差平方和・最小値・最大値（チャンク単位で結合できる）"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+
+    def update(self, values):
+        """values: (行数, 列数) の配列（欠損値は NaN）"""
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0).astype(float)
+        if not n.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, values, 0).sum(axis=0) / n
+            m2 = np.where(valid, (values - mean) ** 2, 0).sum(axis=0)
+        other = Moments(self.columns)
+        other.n = n
+        other.mean = np.nan_to_num(mean)
+        other.m2 = m2
+        other.min = np.where(valid, values, np.inf).min(axis=0)
+        other.max = np.where(valid, values, -np.inf).max(axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        # Chan らの方法で平均と偏差平方和を結合する
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.mean + np.where(n > 0, delta * other.n / n, 0)
+            m2 = self.m2 + other.m2 + np.where(n > 0, delta ** 2 * self.n * other.n / n, 0)
+        self.n, self.mean, self.m2 = n, mean, m2
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    @property
+    def var(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            '有効N': self.n,
+            '平均値': np.where(self.n > 0, self.mean, np.nan),
+            '標準偏差': self.std,
+            '分散': self.var,
+            '最小値': np.where(self.n > 0, self.min, np.nan),
+            '最大値': np.where(self.n > 0, self.max, np.nan),
+        }, index=self.columns)
+
+
+class GroupedMoments:
+    """カテゴリ変数の水準ごとの Moments"""
+
+    def __init__(self, group_col, columns):
+        self.group_col = group_col
+        self.columns = list(columns)
+        self.groups = {}
+
+    def update(self, chunk):
+        for level, part in chunk.groupby(self.group_col, sort=False):
+            self.groups.setdefault(level, Moments(self.columns)).update(part[self.columns].to_numpy(dtype=float))
+
+    def merge(self, other):
+        for level, moments in other.groups.items():
+            if level in self.groups:
+                self.groups[level].merge(moments)
+            else:
+                self.groups[level] = moments
+        return self
+
+    @property
+    def levels(self):
+        return list(self.groups)
+
+    def welch_ttest(self, level0, level1):
+        """2群の平均値の差の検定（Welch の t 検定）を列ごとに行う"""
+        g0, g1 = self.groups[level0], self.groups[level1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            se0 = g0.var / g0.n
+            se1 = g1.var / g1.n
+            t = (g0.mean - g1.mean) / np.sqrt(se0 + se1)
+            df = (se0 + se1) ** 2 / (se0 ** 2 / (g0.n - 1) + se1 ** 2 / (g1.n - 1))
+        p = 2 * stats.t.sf(np.abs(t), df)
+        return pd.DataFrame({
+            f'{level0}M': g0.mean, f'{level0}S.D': g0.std,
+            f'{level1}M': g1.mean, f'{level1}S.D': g1.std,
+            'df': df, 't': np.abs(t), 'p': p,
+        }, index=self.columns)
+
+    def anova(self):
+        """一要因分散分析（対応なし）を列ごとに行う"""
+        moments = list(self.groups.values())
+        n = np.array([m.n for m in moments])
+        means = np.array([m.mean for m in moments])
+        total_n = n.sum(axis=0)
+        k = (n > 0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grand_mean = (n * means).sum(axis=0) / total_n
+            ss_between = (n * (means - grand_mean) ** 2).sum(axis=0)
+            ss_within = np.array([m.m2 for m in moments]).sum(axis=0)
+            df_between = k - 1
+            df_within = total_n - k
+            f = (ss_between / df_between) / (ss_within / df_within)
+            eta_squared = ss_between / (ss_between + ss_within)
+        p = stats.f.sf(f, df_between, df_within)
+        return pd.DataFrame({
+            'df': df_within, 'F': f, 'p': p, 'η²': eta_squared,
+        }, index=self.columns)
+
+
+class Contingency:
+    """2つのカテゴリ変数の度数（クロス表）"""
+
+    def __init__(self, col1, col2):
+        self.col1 = col1
+        self.col2 = col2
+        self.counts = None
+
+    def update(self, chunk):
+        self._add(chunk.groupby([self.col1, self.col2], sort=False).size())
+
+    def merge(self, other):
+        if other.counts is not None:
+            self._add(other.counts)
+        return self
+
+    def _add(self, counts):
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+    def crosstab(self):
+        return self.counts.unstack(fill_value=0).sort_index().sort_index(axis=1).astype(int)
+
+    def chi2(self):
+        return stats.chi2_contingency(self.crosstab())
+
+
+class Covariance:
+    """数値変数の共分散行列（列の組ごとに、両方が欠損値でない行から計算する）
+
+    DataFrame.cov()・DataFrame.corr() と同じく、列の組 (i, j) ごとに有効な行数・平均・偏差平方和・
+    偏差積和を持つ。mean[i, j] と m2[i, j] は、列 i と列 j がともに有効な行での列 i の平均と偏差平方和。
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.mean = np.zeros((p, p))
+        self.m2 = np.zeros((p, p))
+        self.comoment = np.zeros((p, p))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        # 桁落ちを防ぐため、チャンクの列ごとの平均で中心化してから集計する
+        with np.errstate(invalid='ignore'):
+            center = np.nan_to_num(np.nanmean(values, axis=0))
+        centered = np.where(valid, values - center, 0)
+        indicator = valid.astype(float)
+        other = Covariance(self.columns)
+        other.n = indicator.T @ indicator
+        # sums[i, j]: 列 i と列 j がともに有効な行での、列 i の（中心化した）値の合計
+        sums = centered.T @ indicator
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(other.n > 0, sums / other.n, 0)
+        other.mean = mean + center[:, None]
+        other.m2 = (centered ** 2).T @ indicator - sums * mean
+        other.comoment = centered.T @ centered - sums * mean.T
+        self.merge(other)
+
+    def merge(self, other):
+        # Chan らの方法で、列の組ごとに平均・偏差平方和・偏差積和を結合する
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * other.n / n, 0)
+            self.mean = self.mean + np.where(n > 0, delta * other.n / n, 0)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * weight
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.n = n
+        return self
+
+    def cov(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = np.where(self.n > 1, self.comoment / (self.n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def corr(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        # 分散が0の列は、DataFrame.corr() と同じく対角成分も NaN とする
+        np.fill_diagonal(r, np.where(np.diag(self.m2) > 0, 1.0, np.nan))
+        return pd.DataFrame(np.clip(r, -1, 1), index=self.columns, columns=self.columns)
+
+    def corr_pvalues(self):
+        r = self.corr().to_numpy()
+        dof = self.n - 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = r * np.sqrt(dof / (1 - r ** 2))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+        np.fill_diagonal(p, np.where(np.isnan(np.diag(r)), np.nan, 0.0))
+        return pd.DataFrame(p, index=self.columns, columns=self.columns)
+
+    def to_result(self):
+        """engine.correlation と同じ形式の結果（ピアソンの相関係数）"""
+        return CorrelationResult('pearson', self.corr(), self.corr_pvalues(),
+                                 pd.DataFrame(self.n.astype('int64'), index=self.columns, columns=self.columns))
+
+
+class StreamSummary:
+    """CSVを1回読み通す間に、各ページの検定に必要な集計をまとめて行う"""
+
+    def __init__(self, numerical_cols, categorical_cols, group_cols=(), pairs=()):
+        self.numerical_cols = list(numerical_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.rows = 0
+        # 要約統計量（件数・平均値などは厳密に、分位点・ユニーク数・最頻値はスケッチで近似する）
+        self.profile = sketch.Profile(self.numerical_cols, self.categorical_cols)
+        self.covariance = Covariance(self.numerical_cols)
+        self.grouped = {col: GroupedMoments(col, self.numerical_cols) for col in group_cols}
+        self.contingency = {pair: Contingency(*pair) for pair in pairs}
+
+    @property
+    def moments(self):
+        return self.profile.moments
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        values = chunk[self.numerical_cols].apply(pd.to_numeric, errors='coerce')
+        chunk = pd.concat([values, chunk[self.categorical_cols]], axis=1)
+        self.profile.update(chunk)
+        self.covariance.update(values.to_numpy(dtype=float))
+        for grouped in self.grouped.values():
+            grouped.update(chunk)
+        for contingency in self.contingency.values():
+            contingency.update(chunk)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.profile.merge(other.profile)
+        self.covariance.merge(other.covariance)
+        for col, grouped in other.grouped.items():
+            self.grouped[col].merge(grouped)
+        for pair, contingency in other.contingency.items():
+            self.contingency[pair].merge(contingency)
+        return self
+
+
+def infer_schema(source, nrows=INFER_ROWS):
+    """先頭の行だけを読み込み、カテゴリ変数と数値変数の列名を返す"""
+    head = pd.read_csv(source, nrows=nrows)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    categorical_cols = head.select_dtypes(include=['object', 'category']).columns.tolist()
+    numerical_cols = head.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    return categorical_cols, numerical_cols
+
+
+def all_pairs(cols):
+    return list(itertools.combinations(cols, 2))
+
+
+def summarize_csv(source, numerical_cols, categorical_cols, group_cols=(), pairs=(),
+                  chunksize=DEFAULT_CHUNKSIZE):
+    """CSVを chunksize 行ずつ読み込み、StreamSummary を作成する
+
+    メモリ使用量は読み込む行数（chunksize）と列数で決まり、全体の行数には依存しない。
+    """
+    summary = StreamSummary(numerical_cols, categorical_cols, group_cols, pairs)
+    # カテゴリ変数は文字列として読み込み、チャンクごとに型が変わらないようにする
+    reader = pd.read_csv(
+        source,
+        usecols=summary.numerical_cols + summary.categorical_cols,
+        dtype={col: str for col in summary.categorical_cols},
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            summary.update(chunk)
+    return summary
+
+
+class _RangeReader(io.RawIOBase):
+    """ファイルの start バイト目から end バイト目の手前までを読み込むファイルオブジェクト"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _csv_ranges(path, parts):
+    """CSVファイルの見出し行より後ろを、行の境界で parts 個のバイト範囲に分割する
+
+    値の中に改行を含む（引用符で囲まれた）CSVには使えない。
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        bounds = [f.tell()]
+        for i in range(1, parts):
+            f.seek(max(bounds[0], size * i // parts))
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _update_covariance(covariance, reader):
+    with reader:
+        for chunk in reader:
+            values = chunk[covariance.columns].apply(pd.to_numeric, errors='coerce')
+            covariance.update(values.to_numpy(dtype=float))
+    return covariance
+
+
+def _covariance_range(path, start, end, names, columns, chunksize):
+    reader = pd.read_csv(io.BufferedReader(_RangeReader(path, start, end)), header=None, names=names,
+                         usecols=columns, chunksize=chunksize)
+    return _update_covariance(Covariance(columns), reader)
+
+
+def covariance_csv(source, columns, chunksize=DEFAULT_CHUNKSIZE, workers=1):
+    """CSVを chunksize 行ずつ読み込み、数値変数の共分散（Covariance）を計算する
+
+    メモリ使用量は列数の2乗と chunksize で決まり、全体の行数には依存しない。
+    source がファイルのパスで workers が2以上の場合は、ファイルを行の境界で分割して
+    複数のプロセスで集計し、各プロセスの結果を結合する。
+    """
+    columns = list(columns)
+    if workers > 1 and isinstance(source, (str, os.PathLike)):
+        names = pd.read_csv(source, nrows=0).columns.tolist()
+        ranges = _csv_ranges(source, workers)
+        covariance = Covariance(columns)
+        with ProcessPoolExecutor(min(workers, len(ranges)) or 1) as pool:
+            futures = [pool.submit(_covariance_range, source, start, end, names, columns, chunksize)
+                       for start, end in ranges]
+            for future in futures:
+                covariance.merge(future.result())
+        return covariance
+
+    reader = pd.read_csv(source, usecols=columns, chunksize=chunksize)
+    return _update_covariance(Covariance(columns), reader)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+TOTAL_LABEL = '合計'
+HIGHLIGHT_COLOR = 'yellow'
+
+
+def add_totals(table, label=TOTAL_LABEL):
+    """表の右端に行の合計、下端に列の合計を追加した表を返す（元の表は変更しない）"""
+    values = table.to_numpy()
+    row_totals = values.sum(axis=1)
+    body = np.column_stack([values, row_totals])
+    body = np.vstack([body, body.sum(axis=0)])
+    return pd.DataFrame(body,
+                        index=pd.Index(list(table.index) + [label], name=table.index.name),
+                        columns=pd.Index(list(table.columns) + [label], name=table.columns.name))
+
+
+def highlight_css(mask, color=HIGHLIGHT_COLOR):
+    """mask が True のセルに背景色を付ける CSS の表（np.where で一度に作成する）"""
+    css = np.where(mask.to_numpy(dtype=bool), f'background-color: {color}', '')
+    return pd.DataFrame(css, index=list(mask.index), columns=list(mask.columns))
+
+
+def highlight(table, css, formatter=None):
+    """highlight_css で作成した CSS を表に適用した Styler
+
+    同じ CSS を複数の表で使い回せる。合計の行・列など、CSS にないセルは装飾しない。
+    """
+    css = css.reindex(index=list(table.index), columns=list(table.columns), fill_value='')
+    css.index, css.columns = table.index, table.columns
+    styler = table.style.apply(lambda _: css, axis=None)
+    if formatter is not None:
+        styler = styler.format(formatter)
+    return styler
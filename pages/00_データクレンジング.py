@@ -1,7 +1,8 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 import io
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset
 
 
 
@@ -15,13 +16,12 @@ st.caption("Created by Dit-Lab.(Daiki Ito)")
 st.write("データセットに対して、欠損値処理や外れ値の処理などができます")
 st.write("")
 
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=SUPPORTED_TYPES)
 
-if uploaded_file is not None:
-    if uploaded_file.type == 'text/csv':
-        data = pd.read_csv(uploaded_file)
-    else:
-        data = pd.read_excel(uploaded_file)
+dataset = get_dataset(uploaded_file)
+
+if dataset is not None:
+    data = dataset.df
     
     st.subheader('元のデータ')
     st.write(data)
@@ -59,7 +59,7 @@ if uploaded_file is not None:
         file_format = st.selectbox('ダウンロードするファイル形式を選択', ['Excel', 'CSV'])
 
         # アップロードされたファイル名から拡張子を削除し、'_processed'を追加して新しいファイル名を作成
-        download_file_name = f"{uploaded_file.name.rsplit('.', 1)[0]}_processed"
+        download_file_name = f"{dataset.name.rsplit('.', 1)[0]}_processed"
         
         if file_format == 'CSV':
             csv_data = processed_data.to_csv(index=False)
@@ -1,11 +1,130 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import matplotlib.pyplot as plt
-import japanize_matplotlib
+from easy_stat.cube import group_cube
+from easy_stat.engine import BOX_MAX_OUTLIERS, BoxSummary, box_summary, histogram
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.sampling import DEFAULT_MAX_POINTS, density_grid, sample_scatter
+from easy_stat.session import get_dataset, get_demo_dataset
+from easy_stat.sketch import lumped_note, profile
 
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
+# この行数を超えるデータでは、要約統計量を近似（スケッチ）で計算する方法も選べるようにする
+APPROX_PROFILE_ROWS = 1_000_000
+# この行数を超えるデータは、ヒストグラム・箱ひげ図を集計済みの値で描くのを既定にする
+AGGREGATED_CHART_ROWS = 10_000
+# 変数ごとの可視化の1ページあたりの変数の数
+CHARTS_PER_PAGE = 10
 
+# 操作したグラフだけを再実行する（st.fragment がない古い Streamlit では通常どおりページ全体を再実行する）
+fragment = getattr(st, 'fragment', lambda func: func)
+
+
+def histogram_figure(counts, edges, col):
+    """集計済みの度数からヒストグラムを作成する（ブラウザに送るのは階級ごとの度数のみ）"""
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = go.Figure(go.Bar(
+        x=centers, y=counts, customdata=list(zip(edges[:-1], edges[1:])),
+        hovertemplate='%{customdata[0]:.4g} ～ %{customdata[1]:.4g}<br>count = %{y}<extra></extra>',
+    ))
+    fig.update_layout(title=f'【{col}】 の可視化（ヒストグラム）', xaxis_title=col, yaxis_title='count', bargap=0.2)
+    return fig
+
+
+def box_figure(summary, cols, title):
+    """集計済みの四分位数・ひげ・外れ値から箱ひげ図を作成する（横向き）"""
+    table = summary.table
+    fig = go.Figure()
+    for col in cols:
+        row = table.loc[col]
+        fig.add_trace(go.Box(
+            y=[col], q1=[row['第1四分位数']], median=[row['中央値']], q3=[row['第3四分位数']],
+            lowerfence=[row['下ひげ']], upperfence=[row['上ひげ']],
+            orientation='h', name=col, marker_color='#636efa', showlegend=False,
+        ))
+        outliers = summary.outliers[col]
+        if len(outliers):
+            fig.add_trace(go.Scatter(
+                x=outliers, y=[col] * len(outliers), mode='markers', name=col,
+                marker=dict(color='#636efa', size=4), showlegend=False,
+            ))
+    fig.update_layout(title=title)
+    return fig
+
+
+def category_figure(df, col, sort_order):
+    """カテゴリ変数の度数の棒グラフ（dataset.cached で変数・並び替え順ごとに保持する）"""
+    value_counts = df[col].value_counts()
+
+    # 選択された並び替え順に基づいてデータを並び替え
+    if sort_order == '名前順':
+        value_counts = value_counts.sort_index()
+    else:
+        value_counts = value_counts.sort_values(ascending=False)
+
+    fig = px.bar(
+        x=value_counts.index,
+        y=value_counts.values,
+        labels={'x': col, 'y': 'Count'},
+        title=f'【{col}】 の可視化 （{sort_order}）'
+    )
+    fig.update_layout(bargap=0.2)
+    return fig
+
+
+def numeric_figures(df, col, aggregated):
+    """数値変数のヒストグラムと箱ひげ図（dataset.cached で変数・描き方ごとに保持する）"""
+    if aggregated:
+        return (histogram_figure(*histogram(df, col), col),
+                box_figure(box_summary(df, [col]), [col], f'【{col}】 の可視化（箱ひげ図）'))
+    fig_histogram = px.histogram(df, x=col, title=f'【{col}】 の可視化（ヒストグラム）')
+    fig_histogram.update_layout(bargap=0.2)
+    fig_box = px.box(df, x=col, title=f'【{col}】 の可視化（箱ひげ図）')
+    return fig_histogram, fig_box
+
+
+def selected_box_figure(df, cols, aggregated):
+    """選択した数値変数の箱ひげ図（dataset.cached で変数の組み合わせ・描き方ごとに保持する）"""
+    cols = list(cols)
+    if aggregated:
+        return box_figure(box_summary(df, cols), cols, '選択した数値変数の可視化')
+    return px.box(df, x=cols, points="all", title=f'選択した数値変数の可視化')
+
+
+def category_box_figure(df, cat_var, num_var, aggregated):
+    """カテゴリ変数の水準ごとの数値変数の箱ひげ図（dataset.cached で変数の組み合わせ・描き方ごとに保持する）"""
+    title = f'箱ひげ図： 【{cat_var}】 × 【{num_var}】'
+    if not aggregated:
+        return px.box(df, x=cat_var, y=num_var, title=title)
+    # 水準ごとに四分位数・ひげ・外れ値を集計し、水準を1本の箱として描く
+    summaries = {str(level): box_summary(part, [num_var])
+                 for level, part in df.groupby(cat_var, observed=True)[[num_var]]}
+    levels = list(summaries)
+    summary = BoxSummary(
+        pd.concat([summary.table for summary in summaries.values()]).set_axis(levels),
+        {level: summary.outliers[num_var] for level, summary in summaries.items()},
+    )
+    fig = box_figure(summary, levels, title)
+    fig.update_layout(xaxis_title=num_var, yaxis_title=cat_var)
+    return fig
+
+
+def describe(df):
+    """df.describe(include='all').transpose()（dataset.cached で保持する）"""
+    return df.describe(include='all').transpose()
+
+
+@fragment
+def show_category_chart(dataset, col):
+    # 並び替えのオプションを選択するためのセレクトボックスを追加
+    sort_order = st.selectbox(
+        f'【{col}】 の並び替え順を選択してください',
+        ('度数', '名前順'),
+        key=col  # このキーは各カテゴリ変数に対してユニークであることを確保します
+    )
+    st.plotly_chart(dataset.cached(category_figure, col, sort_order))
 
 
 st.set_page_config(page_title="探索的データ分析（EDA）", layout="wide")
@@ -16,78 +135,96 @@ st.write("簡易的な探索的データ分析（EDA）が実行できます")
 st.write("")
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('eda_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('eda_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
     # カテゴリ変数と数値変数の選択
     cols = df.columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
+    numerical_cols = dataset.numerical_cols
 
     # 要約統計量表示
     st.subheader('要約統計量')
-    summary_df = df.describe(include='all').transpose()
-    st.write(summary_df)
+    # 大きなデータでは近似（スケッチ）も選べる（既定は厳密。小さなデータは常に厳密に計算する）
+    profile_mode = '厳密'
+    if len(df) > APPROX_PROFILE_ROWS:
+        profile_mode = st.radio(
+            '計算方法を選択してください',
+            ('厳密', '近似（スケッチ）'),
+            horizontal=True,
+            help='近似では、分位点（KLL）・ユニーク数（HyperLogLog）・最頻値と度数（Space-Saving）を'
+                 'データを1回読み通して計算します（作業用のメモリは行数に依存しません）',
+        )
+    if profile_mode == '厳密':
+        summary_df = dataset.cached(describe)
+        st.write(summary_df)
+    else:
+        sketch = dataset.cached(profile, tuple(numerical_cols), tuple(categorical_cols))
+        st.write(sketch.to_frame(cols))
+        st.caption('count・mean・std・min・max は厳密な値、unique・freq・分位点（25%・50%・75%）は近似値です。')
+        st.write('＜近似値の誤差の目安＞')
+        st.write(sketch.error_bounds())
+        st.caption('分位点の範囲は順位の誤差を考慮した値の範囲（99%）、ユニーク数は相対誤差（標準誤差）、'
+                   'freq は真の度数との差の上限です。')
 
     # 可視化
     st.subheader('可視化')
+    # 水準の多いカテゴリ変数は、出現回数の上位の水準と「その他」にまとめて可視化する
+    dataset = dataset.with_top_levels()
+    df = dataset.df
+    if dataset.lumped_cols:
+        st.caption(lumped_note(dataset.lumped_cols))
+    aggregated = st.checkbox(
+        '集計済みの値でグラフを描く（大きなデータ向け）',
+        value=len(df) > AGGREGATED_CHART_ROWS,
+        help='ヒストグラムの度数と箱ひげ図の四分位数・ひげをサーバー側で計算し、その値だけをブラウザに送ります',
+    )
 
-    # カテゴリ変数の可視化
-    for col in categorical_cols:
-        # 並び替えのオプションを選択するためのセレクトボックスを追加
-        sort_order = st.selectbox(
-            f'【{col}】 の並び替え順を選択してください',
-            ('度数', '名前順'),
-            key=col  # このキーは各カテゴリ変数に対してユニークであることを確保します
-        )
-
-        value_counts = df[col].value_counts()
-
-        # 選択された並び替え順に基づいてデータを並び替え
-        if sort_order == '名前順':
-            value_counts = value_counts.sort_index()
-        else:
-            value_counts = value_counts.sort_values(ascending=False)
+    # 表示する変数（ページ単位、または選択した変数）のグラフだけを作成する
+    chart_cols = categorical_cols + numerical_cols
+    if st.radio('表示する変数', ('ページごと', '変数を選択'), horizontal=True) == 'ページごと':
+        pages = (len(chart_cols) - 1) // CHARTS_PER_PAGE + 1
+        page = 1
+        if pages > 1:
+            page = st.number_input(f'ページ（全{pages}ページ・{len(chart_cols)}変数）', min_value=1, max_value=pages, value=1)
+        start = (page - 1) * CHARTS_PER_PAGE
+        visible_cols = chart_cols[start:start + CHARTS_PER_PAGE]
+    else:
+        visible_cols = st.multiselect('可視化する変数を選択してください', chart_cols, default=chart_cols[:1])
 
-        fig = px.bar(
-            x=value_counts.index,
-            y=value_counts.values,
-            labels={'x': col, 'y': 'Count'},
-            title=f'【{col}】 の可視化 （{sort_order}）'
-        )
-        fig.update_layout(bargap=0.2)
-        st.plotly_chart(fig)
+    categorical_set = set(categorical_cols)
+    for col in visible_cols:
+        # カテゴリ変数の可視化
+        if col in categorical_set:
+            show_category_chart(dataset, col)
+            continue
 
-    # 数値変数の可視化
-    for col in numerical_cols:
-        fig = px.histogram(df, x=col, title=f'【{col}】 の可視化（ヒストグラム）')
-        fig.update_layout(bargap=0.2)
-        st.plotly_chart(fig)
-        fig = px.box(df, x=col, title=f'【{col}】 の可視化（箱ひげ図）')
-        st.plotly_chart(fig)
+        # 数値変数の可視化
+        fig_histogram, fig_box = dataset.cached(numeric_figures, col, aggregated)
+        st.plotly_chart(fig_histogram)
+        st.plotly_chart(fig_box)
 
     # アップロードされたデータセットに数値変数が含まれている場合
     if numerical_cols:
         st.subheader("選択した数値変数の可視化（箱ひげ図）")
         selected_num_cols = st.multiselect('数値変数を選択してください', numerical_cols, default =numerical_cols)
-        fig = px.box(df, x=selected_num_cols, points="all", title=f'選択した数値変数の可視化')
+        fig = dataset.cached(selected_box_figure, tuple(selected_num_cols), aggregated)
+        if aggregated:
+            st.caption(f'点は外れ値のみ表示しています（変数ごとに中央値から遠い順に最大{BOX_MAX_OUTLIERS}個）')
         st.plotly_chart(fig)
 
 
@@ -100,17 +237,41 @@ if df is not None:
         st.error('2項目以上を選択することはできません。選択をクリアし、2項目のみを選択してください。')
     elif len(selected_vars) == 2:
         var1, var2 = selected_vars
+        # カテゴリ変数の組み合わせごとの集計（カテゴリ変数を含む表示でだけ、使う組み合わせを集計する）
+        if var1 in categorical_cols or var2 in categorical_cols:
+            cube = dataset.cached(group_cube, tuple(categorical_cols), tuple(numerical_cols))
      
         # カテゴリ×カテゴリ
         if var1 in categorical_cols and var2 in categorical_cols:
-            cross_tab = pd.crosstab(df[var1], df[var2])
+            cross_tab = cube.crosstab(var1, var2)
             fig = px.imshow(cross_tab,labels=dict(color="Count"),title=f'度数： 【{var1}】 × 【{var2}】')
             st.plotly_chart(fig)
 
         # 数値×数値
         elif var1 in numerical_cols and var2 in numerical_cols:
-            fig = px.scatter(df, x=var1, y=var2, title=f'散布図： 【{var1}】 × 【{var2}】')
-            st.plotly_chart(fig)
+            max_points = st.number_input('散布図に描く点の数の上限', min_value=1_000, value=DEFAULT_MAX_POINTS, step=1_000)
+            if len(df) <= max_points:
+                fig = px.scatter(df, x=var1, y=var2, title=f'散布図： 【{var1}】 × 【{var2}】')
+                st.plotly_chart(fig)
+            else:
+                scatter_mode = st.radio('表示方法を選択してください', ('抽出した点', '密度（ヒートマップ）'), horizontal=True)
+                if scatter_mode == '抽出した点':
+                    # 外れ値と、x・y の格子ごとに抽出した点を WebGL で描く
+                    sample = dataset.cached(sample_scatter, var1, var2, int(max_points))
+                    fig = px.scatter(df.iloc[sample.index], x=var1, y=var2, render_mode='webgl',
+                                     title=f'散布図： 【{var1}】 × 【{var2}】')
+                    st.plotly_chart(fig)
+                    st.caption(sample.note)
+                else:
+                    # サーバー側で集計した2次元の度数を描く（ブラウザに送るのは格子ごとの度数のみ）
+                    counts, x_edges, y_edges = density_grid(df[var1], df[var2])
+                    fig = go.Figure(go.Heatmap(
+                        x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2, z=counts.T,
+                        colorscale='Blues', colorbar=dict(title='度数'),
+                    ))
+                    fig.update_layout(title=f'密度： 【{var1}】 × 【{var2}】', xaxis_title=var1, yaxis_title=var2)
+                    st.plotly_chart(fig)
+                    st.caption(f'{int(counts.sum()):,}点の度数を{len(x_edges) - 1}×{len(y_edges) - 1}の格子で表示しています')
             st.write(f'相関係数： {df[var1].corr(df[var2]):.2f}')
         
         # カテゴリ×数値
@@ -120,8 +281,11 @@ if df is not None:
             else:
                 cat_var, num_var = var2, var1
             
-            fig = px.box(df, x=cat_var, y=num_var, title=f'箱ひげ図： 【{cat_var}】 × 【{num_var}】')
+            fig = dataset.cached(category_box_figure, cat_var, num_var, aggregated)
+            if aggregated:
+                st.caption(f'点は外れ値のみ表示しています（水準ごとに中央値から遠い順に最大{BOX_MAX_OUTLIERS}個）')
             st.plotly_chart(fig)
+            st.write(cube.summary([cat_var], num_var))
     
     st.subheader('２つのカテゴリ変数と１つの数値変数による棒グラフ')
 
@@ -132,8 +296,9 @@ if df is not None:
     if len(cat_vars) == 2 and num_var:
         cat_var1, cat_var2 = cat_vars
 
-        # データの準備
-        grouped_df = df.groupby([cat_var1, cat_var2])[num_var].mean().reset_index()
+        # データの準備（カテゴリ変数の組み合わせごとの集計から平均値を取り出す）
+        cube = dataset.cached(group_cube, tuple(categorical_cols), tuple(numerical_cols))
+        grouped_df = cube.summary([cat_var1, cat_var2], num_var)['平均値'].rename(num_var).reset_index()
 
         # 棒グラフの作成
         fig = px.bar(
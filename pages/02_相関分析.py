@@ -1,11 +1,96 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.figure_factory as ff
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-from PIL import Image
+import numpy as np
+from easy_stat.assets import show_image
+from easy_stat.engine import CORRELATION_METHODS, correlation
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+from easy_stat.streaming import DEFAULT_CHUNKSIZE, covariance_csv, infer_schema
 
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+# 解釈の補助の表の1ページあたりの組み合わせ数
+PAIRS_PER_PAGE = 20
+# ヒートマップのセルに相関係数を表示する変数の数の上限（これを超えると大規模表示に切り替える）
+ANNOTATION_MAX_VARS = 60
+# 大規模表示でブラウザに送るヒートマップの1辺のセル数の上限
+HEATMAP_MAX_CELLS = 400
+# 単精度で相関行列を計算し、相関行列・p値の表を省略する変数の数
+LARGE_MATRIX_VARS = 200
+
+
+def show_correlation(result, use_cluster_order=False):
+    """相関分析の結果（相関行列・p値・ヒートマップ・解釈の補助）を表示する"""
+    corr_matrix = result.matrix
+
+    # 相関マトリックスの表示
+    st.subheader('相関マトリックス')
+    if len(corr_matrix) <= LARGE_MATRIX_VARS:
+        st.dataframe(corr_matrix)
+        st.write('＜p値＞')
+        st.dataframe(result.pvalues)
+    else:
+        # 変数が多い場合は行列全体を表に送らず、相関の強い組み合わせ（解釈の補助）のみを表に表示する
+        st.caption(f'変数が{LARGE_MATRIX_VARS}を超えるため、相関行列とp値の表は省略し、'
+                   'ヒートマップと「解釈の補助」（相関の強い順の組み合わせ）のみを表示します')
+    
+    # ヒートマップの表示
+    heatmap_matrix = corr_matrix
+    if use_cluster_order:
+        heatmap_matrix = corr_matrix.loc[result.cluster_order, result.cluster_order]
+
+    if len(corr_matrix) <= ANNOTATION_MAX_VARS:
+        # plotly.expressを使用
+        fig = px.imshow(heatmap_matrix, color_continuous_scale='rdbu', labels=dict(color="相関係数"))
+
+        # アノテーションの追加 (相関係数の数値をセルに表示)
+        annotations = [{
+            'x': j,
+            'y': i,
+            'xref': 'x',
+            'yref': 'y',
+            'text': f"{value:.2f}",
+            'showarrow': False,
+            'font': {
+                'color': 'black' if -0.5 < value < 0.5 else 'white'
+            }
+        } for i, row in enumerate(heatmap_matrix.values) for j, value in enumerate(row)]
+        fig.update_layout(title="相関係数のヒートマップ", annotations=annotations)
+    else:
+        # 変数が多い場合は、セルへの数値の表示をやめ、値はマウスを重ねたときのみ表示する
+        # セル数が表示できる点の数を超える場合は、隣り合う変数をまとめて平均する
+        step = -(-len(heatmap_matrix) // HEATMAP_MAX_CELLS)
+        labels = heatmap_matrix.columns.tolist()
+        z = heatmap_matrix.to_numpy(dtype=np.float32)
+        if step > 1:
+            blocks = np.arange(len(labels)) // step
+            z = np.nan_to_num(z)
+            z = np.add.reduceat(np.add.reduceat(z, np.arange(0, len(labels), step), axis=0),
+                                np.arange(0, len(labels), step), axis=1)
+            counts = np.bincount(blocks)
+            z = z / np.outer(counts, counts)
+            labels = [f'{labels[i]} ～ {labels[min(i + step, len(labels)) - 1]}' for i in range(0, len(labels), step)]
+            st.caption(f'変数が多いため、{step}変数ずつまとめた平均値を表示しています')
+
+        fig = go.Figure(go.Heatmap(
+            z=z, x=labels, y=labels, zmin=-1, zmax=1, colorscale='rdbu',
+            colorbar=dict(title="相関係数"),
+            hovertemplate='%{y} × %{x}<br>r = %{z:.2f}<extra></extra>',
+        ))
+        fig.update_layout(title="相関係数のヒートマップ", yaxis=dict(autorange='reversed'),
+                          xaxis=dict(showticklabels=False), height=800)
+    st.plotly_chart(fig)
+    
+    # 相関の解釈（相関係数の絶対値が大きい順）
+    st.subheader('解釈の補助')
+    pairs = result.top_pairs()
+    pages = (len(pairs) - 1) // PAIRS_PER_PAGE + 1
+    page = 1
+    if pages > 1:
+        page = st.number_input(f'ページ（全{pages}ページ・{len(pairs)}組）', min_value=1, max_value=pages, value=1)
+    start = (page - 1) * PAIRS_PER_PAGE
+    st.dataframe(pairs.iloc[start:start + PAIRS_PER_PAGE].style.format({'r': "{:.2f}", 'p': "{:.3f}"}))
 
 
 st.set_page_config(page_title="相関分析", layout="wide")
@@ -16,89 +101,83 @@ st.write("２つの変数から相関係数を表やヒートマップで出力
 st.write("")
 
 # 分析のイメージ
-image = Image.open('correlation.png')
-st.image(image)
+show_image('correlation.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+# 大容量のCSVを分割して読み込むかどうかのチェックボックス
+# （アップロードされたファイル自体はメモリ上にあるため、省けるのはデータフレームの作成分のメモリ）
+use_streaming = st.checkbox('大容量のCSVを分割して集計する（データフレームを作成しない・ピアソンの相関係数のみ）')
+
+if use_demo_data:
+    dataset = get_demo_dataset('correlation_demo.xlsx')
+elif use_streaming:
+    # ファイル全体をデータフレームとして読み込まない
+    dataset = None
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('correlation_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
     # 数値変数の抽出
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # 数値変数の選択
     st.subheader("数値変数の選択")
     selected_cols = st.multiselect('数値変数を選択してください', numerical_cols)
+
+    # 相関係数の種類
+    method = st.radio('相関係数', CORRELATION_METHODS, horizontal=True,
+                      format_func=lambda x: {'pearson': 'ピアソン', 'spearman': 'スピアマン'}[x])
+    # ヒートマップの並び順
+    use_cluster_order = st.checkbox('ヒートマップを階層的クラスタリングで並べ替える')
     
     if len(selected_cols) < 2:
         st.write('少なくとも2つの変数を選択してください。')
     else:
-        # 相関マトリックスの計算
-        corr_matrix = df[selected_cols].corr()
-        
-        # 相関マトリックスの表示
-        st.subheader('相関マトリックス')
-        st.dataframe(corr_matrix)
-        
-        # ヒートマップの表示 (plotly.expressを使用)
-        fig = px.imshow(corr_matrix, color_continuous_scale='rdbu', labels=dict(color="相関係数"))
+        # 相関マトリックスの計算（変数が多い場合は単精度で計算する）
+        dtype = np.float32 if len(selected_cols) > LARGE_MATRIX_VARS else np.float64
+        # 同じ変数の組み合わせでは再計算しない（クラスタリングの並び順も結果と一緒に保持される）
+        result = dataset.cached(correlation, tuple(selected_cols), method, dtype)
+        show_correlation(result, use_cluster_order)
 
-        # アノテーションの追加 (相関係数の数値をセルに表示)
-        annotations = []
-        for i, row in enumerate(corr_matrix.values):
-            for j, value in enumerate(row):
-                annotations.append({
-                    'x': j,
-                    'y': i,
-                    'xref': 'x',
-                    'yref': 'y',
-                    'text': f"{value:.2f}",
-                    'showarrow': False,
-                    'font': {
-                        'color': 'black' if -0.5 < value < 0.5 else 'white'
-                    }
-                })
+elif use_streaming and uploaded_file is not None:
+    if not uploaded_file.name.lower().endswith('.csv'):
+        st.error('分割して読み込めるのはCSVファイルのみです。')
+    else:
+        uploaded_file.seek(0)
+        _, numerical_cols = infer_schema(uploaded_file)
 
-        fig.update_layout(title="相関係数のヒートマップ", annotations=annotations)
-        st.plotly_chart(fig)
-        
-        # 相関の解釈
-        st.subheader('解釈の補助')
-        for i, col1 in enumerate(selected_cols):
-            for j, col2 in enumerate(selected_cols):
-                if i < j:
-                    correlation = corr_matrix.loc[col1, col2]
-                    description = f'【{col1}】と【{col2}】には'
-                    if correlation > 0.7:
-                        description += f'強い正の相関がある (r={correlation:.2f})'
-                    elif correlation > 0.3:
-                        description += f'中程度の正の相関がある (r={correlation:.2f})'
-                    elif correlation > -0.3:
-                        description += f'ほとんど相関がない (r={correlation:.2f})'
-                    elif correlation > -0.7:
-                        description += f'中程度の負の相関がある (r={correlation:.2f})'
-                    else:
-                        description += f'強い負の相関がある (r={correlation:.2f})'
-                    st.write(description)
+        # 数値変数の選択（集計は１回の読み込みで行うため、事前に選択する）
+        st.subheader("数値変数の選択")
+        selected_cols = st.multiselect('数値変数を選択してください', numerical_cols)
+        chunksize = st.number_input('１回に読み込む行数', min_value=1_000, value=DEFAULT_CHUNKSIZE, step=10_000)
+        # ヒートマップの並び順
+        use_cluster_order = st.checkbox('ヒートマップを階層的クラスタリングで並べ替える')
 
+        if len(selected_cols) < 2:
+            st.write('少なくとも2つの変数を選択してください。')
+        elif st.button('相関係数の計算'):
+            uploaded_file.seek(0)
+            with st.spinner('集計しています...'):
+                covariance = covariance_csv(uploaded_file, selected_cols, chunksize=int(chunksize))
+            st.session_state['stream_correlation'] = (uploaded_file.file_id, tuple(selected_cols), covariance.to_result())
 
+        stored = st.session_state.get('stream_correlation')
+        if stored is not None and stored[:2] == (uploaded_file.file_id, tuple(selected_cols)):
+            result = stored[2]
+            n = result.n.to_numpy()
+            st.caption(f'変数の組ごとに、両方が欠損値でない {n.min()}〜{n.max()} 行から計算しています')
+            show_correlation(result, use_cluster_order)
 
 st.write('ご意見・ご要望は→', 'https://forms.gle/G5sMYm7dNpz2FQtU9', 'まで')
 # Copyright
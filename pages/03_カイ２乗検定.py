@@ -1,12 +1,13 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import scipy.stats as stats
-import plotly.express as px
-import plotly.figure_factory as ff
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-from PIL import Image
+from easy_stat.assets import show_image
+from easy_stat.engine import chi_square, chi_square_exact, chi_square_screening
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+from easy_stat.sketch import lumped_note
+from easy_stat.styling import add_totals, highlight, highlight_css
+
+px = lazy_import('plotly.express')
 
 st.set_page_config(page_title="カイ２乗分析", layout="wide")
 
@@ -16,32 +17,34 @@ st.write("２つの変数からクロス表やヒートマップを出力し、
 st.write("")
 
 # 分析のイメージ
-image = Image.open('chi_square.png')
-st.image(image)
+show_image('chi_square.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('chi_square_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('chi_square_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
+    # 水準の多いカテゴリ変数は、出現回数の上位の水準と「その他」にまとめて使う
+    dataset = dataset.with_top_levels()
+    df = dataset.df
+    if dataset.lumped_cols:
+        st.caption(lumped_note(dataset.lumped_cols))
+
     # カテゴリ変数の抽出
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
 
     # カテゴリ変数の選択
     st.subheader("カテゴリ変数の選択")
@@ -52,8 +55,9 @@ if df is not None:
     # 選択した変数の度数分布のバープロット
     st.subheader(f'【{selected_col1}】 と 【{selected_col2}】 の度数分布')
     
-    # クロス表の作成
-    crosstab = pd.crosstab(df[selected_col1], df[selected_col2])
+    # クロス表の作成とカイ２乗検定の実行
+    result = chi_square(df, selected_col1, selected_col2)
+    crosstab = result.observed
 
     # クロス表を長い形式に変換
     crosstab_long = crosstab.reset_index().melt(id_vars=selected_col1, value_name='度数')
@@ -75,44 +79,24 @@ if df is not None:
     # クロス表の作成と表示
     st.subheader(f'【{selected_col1}】 と 【{selected_col2}】 のクロス表')
 
-    # カイ２乗検定の実行
-    chi2, p_value, dof, expected = stats.chi2_contingency(crosstab)
-
-    # 期待度数のデータフレームの作成
-    expected_df = pd.DataFrame(expected, columns=crosstab.columns, index=crosstab.index)
-    expected_df = expected_df.round(2)  # 小数点第2位で四捨五入
-
-    # (観測度数 - 期待度数)^2 / 期待度数 の計算
-    chi_square_value_df = ((crosstab - expected) ** 2) / expected
-    chi_square_value_df = chi_square_value_df.round(2)  # 小数点第2位で四捨五入
+    chi2, p_value = result.chi2, result.p_value
 
-    # 有意差を確認するための残差の計算
-    residuals = (crosstab - expected) / np.sqrt(expected)
-
-    # 有意水準0.05でのz値の閾値
-    threshold = stats.norm.ppf(1 - 0.05 / 2)
-
-    # 有意に差が出ているセルのマスキング
-    mask_significant = residuals.abs() > threshold
-
-    # セルに色を付ける
-    colors = mask_significant.applymap(lambda x: 'background-color: yellow' if x else '')
+    # 有意に差が出ているセル（調整済み残差、有意水準0.05）に色を付ける CSS を一度だけ作成し、3つの表で使う
+    colors = highlight_css(result.significant)
 
     # データフレームを表示
     st.subheader('データフレームの表示')
-    
-    st.write('＜観測度数＞')
+
     # 合計の行と列を追加
-    crosstab['合計'] = crosstab.sum(axis=1)  # 行の合計
-    crosstab.loc['合計'] = crosstab.sum()  # 列の合計
-    st.write(crosstab.style.apply(lambda x: colors, axis=None))
+    st.write('＜観測度数＞')
+    st.write(highlight(add_totals(crosstab), colors))
 
     st.write('＜期待度数＞')
-    st.write(expected_df.style.apply(lambda x: colors, axis=None).format("{:.2f}"))
+    st.write(highlight(add_totals(result.expected), colors, "{:.2f}"))
 
     st.write('＜カイ二乗値＞')
     st.caption('(観測度数 - 期待度数)^2 / 期待度数')
-    st.write(chi_square_value_df.style.apply(lambda x: colors, axis=None).format("{:.2f}"))
+    st.write(highlight(add_totals(result.contributions), colors, "{:.2f}"))
 
     st.caption('有意に差が出ているセルは黄色で表示されます:')
 
@@ -121,16 +105,30 @@ if df is not None:
     st.write(f'カイ二乗統計量: {chi2:.2f}')
     st.write(f'P値: {p_value:.2f}')
 
-    # ヒートマップの作成（合計を除く）
+    # 期待度数が小さいセルがある場合は、正確検定の p 値を確認できるようにする
+    small_expected_ratio = (result.expected.to_numpy() < 5).mean()
+    if small_expected_ratio > 0:
+        st.warning(f'期待度数が5未満のセルが{small_expected_ratio:.0%}あります。カイ二乗分布による近似の精度が低いため、正確検定の P値も確認してください。')
+    with st.expander('正確検定（2×2 の表は Fisher の正確確率検定、それ以外はモンテカルロ法）'):
+        n_simulations = st.number_input('モンテカルロ法のシミュレーション回数', min_value=1_000, max_value=1_000_000, value=10_000, step=1_000)
+        if st.button('正確検定の実行'):
+            with st.spinner('計算しています...'):
+                # シミュレーション回数が多い場合は、CPU の数のプロセスに分けて行う
+                exact = chi_square_exact(result.observed, int(n_simulations), workers=None)
+            st.write(f'{exact.method}による P値: {exact.p_value:.4f}')
+            if exact.n_simulations:
+                st.caption(f'シミュレーション回数： {exact.n_simulations}（P値の標準誤差： {exact.std_error:.4f}）')
+
+    # ヒートマップの作成
     fig_heatmap = px.imshow(
-        crosstab.iloc[:-1, :-1],  # 合計の行と列を除外
+        crosstab,
         labels=dict(x=selected_col2, y=selected_col1, color='観測度数'),
         title=f'【{selected_col1}】 と 【{selected_col2}】 の観測度数ヒートマップ'
     )
 
     # アノテーションの追加 (観測度数をセルに表示)
     annotations = []
-    for i, row in enumerate(crosstab.iloc[:-1, :-1].values):
+    for i, row in enumerate(crosstab.values):
         for j, value in enumerate(row):
             annotations.append({
                 'x': j,
@@ -152,6 +150,23 @@ if df is not None:
     # ヒートマップの表示
     st.plotly_chart(fig_heatmap)
 
+    # すべての組み合わせの一括検定（スクリーニング）
+    st.subheader('【カテゴリ変数の組み合わせの一括検定】')
+    st.write('選択したカテゴリ変数のすべての組み合わせについてカイ２乗検定を行い、関連の強さ（クラメールのV）の大きい順に表示します。')
+    screening_cols = st.multiselect('一括検定するカテゴリ変数を選択してください', categorical_cols, default=categorical_cols)
+
+    if len(screening_cols) < 2:
+        st.write('少なくとも2つの変数を選択してください。')
+    elif st.button('一括検定の実行'):
+        st.session_state['chi_square_screening'] = tuple(screening_cols)
+
+    if st.session_state.get('chi_square_screening') == tuple(screening_cols):
+        screening = dataset.cached(chi_square_screening, tuple(screening_cols))
+        st.write(f'{len(screening)}組の組み合わせを検定しました')
+        st.dataframe(screening.style.format({'χ²': "{:.2f}", 'p': "{:.3f}", 'クラメールのV': "{:.3f}",
+                                             '期待度数5未満の割合': "{:.0%}"}))
+        st.caption('p<0.01** p<0.05* p<0.1† ／ 度数不足： 期待度数が5未満のセルが2割を超えるか、1未満のセルがある組み合わせ（検定結果の精度が低い）')
+
 st.write('ご意見・ご要望は→', 'https://forms.gle/G5sMYm7dNpz2FQtU9', 'まで')
 # Copyright
 st.subheader('© 2022-2024 Dit-Lab.(Daiki Ito). All Rights Reserved.')
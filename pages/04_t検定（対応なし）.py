@@ -1,13 +1,14 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from scipy import stats
-import math
-from statistics import median, variance
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-import japanize_matplotlib
-from PIL import Image
+from easy_stat.assets import show_image
+from easy_stat.cube import group_cube
+from easy_stat.engine import summarize, welch_ttest_moments
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
+mlines = lazy_import('matplotlib.lines')
 
 st.set_page_config(page_title="t検定(対応なし)", layout="wide")
 
@@ -17,34 +18,30 @@ st.write("変数の選択　→　t検定　→　表作成　→　解釈の補
 st.write("")
 
 # 分析のイメージ
-image = Image.open('ttest.png')
-st.image(image)
+show_image('ttest.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('ttest_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('ttest_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
     # カテゴリ変数の抽出
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
     # 数値変数の抽出
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # カテゴリ変数の選択
     st.subheader("カテゴリ変数の選択")
@@ -83,86 +80,17 @@ if df is not None:
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            # 数値変数の要素の数を取得
-            num_range = len(num_vars)
-
-            # 各値の初期化
-            n = 1
-            summaryList = [num_vars]
-            summaryColumns = ["有効N", "平均値", "中央値", "標準偏差", "分散",
-                            "最小値", "最大値"]
-
-            # 目的変数、従属変数から作業用データフレームのセット
-            df00_list = cat_var + num_vars
-            df00 = df[df00_list]
-
-            # サマリ(df0)用のデータフレームのセット
-            df0 = pd.DataFrame(index=summaryList, columns=summaryColumns)
-
-            # サマリ(df0)用のデータフレームに平均値と標準偏差を追加
-            for summary in range(num_range):
-                # 列データの取得（nは従属変数の配列番号）
-                y = df00.iloc[:, n]
-
-                # 従属変数の列データの計算処理
-                df0.at[df00.columns[n], '有効N'] = len(y)
-                df0.at[df00.columns[n], '平均値'] = y.mean()
-                df0.at[df00.columns[n], '中央値'] = median(y)
-                df0.at[df00.columns[n], '標準偏差'] = y.std()
-                df0.at[df00.columns[n], '分散'] = variance(y)
-                df0.at[df00.columns[n], '最小値'] = y.min()
-                df0.at[df00.columns[n], '最大値'] = y.max()
-                n += 1
-
             # 要約統計量（サマリ）のデータフレームを表示
+            df0 = summarize(df, num_vars)
             st.write(df0.style.format("{:.2f}"))
 
             st.write('【平均値の差の検定（対応なし）】')
-            groups = df[cat_var].iloc[:, 0].unique().tolist()
-
-            # 結果を保存するデータフレームの初期化
-            columns = ['全体M', '全体S.D', f'{groups[0]}M', f'{groups[0]}S.D',
-                    f'{groups[1]}M', f'{groups[1]}S.D', 'df', 't', 'p', 'sign', 'd']
-            df_results = pd.DataFrame(columns=columns)
-
-            for var in num_vars:
-                series = df[var]
-                group0_data = df[df[cat_var[0]] == groups[0]][var]
-                group1_data = df[df[cat_var[0]] == groups[1]][var]
-
-                ttest_result = stats.ttest_ind(group0_data, group1_data, equal_var=False)
-                overall_mean = series.mean()
-                overall_std = series.std()
-                g0_mean = group0_data.mean()
-                g0_std = group0_data.std()
-                g1_mean = group1_data.mean()
-                g1_std = group1_data.std()
-                effect_size = abs(g0_mean - g1_mean) / overall_std
-
-                if ttest_result.pvalue < 0.01:
-                    significance = '**'
-                elif ttest_result.pvalue < 0.05:
-                    significance = '*'
-                elif ttest_result.pvalue < 0.1:
-                    significance = '†'
-                else:
-                    significance = 'n.s.'
-
-                results_row = {
-                    '全体M': overall_mean,
-                    '全体S.D': overall_std,
-                    f'{groups[0]}M': g0_mean,
-                    f'{groups[0]}S.D': g0_std,
-                    f'{groups[1]}M': g1_mean,
-                    f'{groups[1]}S.D': g1_std,
-                    'df': len(series) - 1,
-                    't': abs(ttest_result.statistic),
-                    'p': ttest_result.pvalue,
-                    'sign': significance,
-                    'd': effect_size
-                }
-
-                df_results.loc[var] = results_row
+            # 水準ごとの集計（GroupCube）は変数を選び直しても使い回す
+            cube = dataset.cached(group_cube, tuple(categorical_cols), tuple(numerical_cols))
+            result = welch_ttest_moments(cube.grouped_moments(cat_var[0], num_vars), xcat_var_d,
+                                         cube.level_counts(cat_var[0]))
+            groups = result.groups
+            df_results = result.table
 
             # 結果の表示
             # 数値型の列だけを選択
@@ -188,8 +116,8 @@ if df is not None:
             # サンプルサイズの表示
             st.write('【サンプルサイズ】')
             st.write(f'全体N ＝ {len(df)}')
-            st.write(f'● {groups[0]}： {len(group0_data)}')
-            st.write(f'● {groups[1]}： {len(group1_data)}')
+            for group in groups:
+                st.write(f'● {group}： {result.group_sizes[group]}')
 
             st.subheader('【解釈の補助】')
 
@@ -214,9 +142,9 @@ if df is not None:
             # ブラケット付きの棒グラフを出力する機能の更新
             def add_bracket(ax, x1, x2, y, text):
                 bracket_length = 4  # ブラケットの両端の縦棒の長さを固定
-                ax.add_line(Line2D([x1, x1], [y, y + bracket_length], color='black', lw=1))
-                ax.add_line(Line2D([x2, x2], [y, y + bracket_length], color='black', lw=1))
-                ax.add_line(Line2D([x1, x2], [y + bracket_length, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x1, x1], [y, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x2, x2], [y, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x1, x2], [y + bracket_length, y + bracket_length], color='black', lw=1))
                 ax.text((x1 + x2) / 2, y + bracket_length + 2, text, ha='center', va='bottom')
 
             # グラフ描画部分の更新
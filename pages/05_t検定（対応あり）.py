@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from scipy import stats
-import math
-from statistics import median, variance
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-import japanize_matplotlib
-from PIL import Image
+from easy_stat.assets import show_image
+from easy_stat.engine import paired_ttest, summarize
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
+mlines = lazy_import('matplotlib.lines')
 
 st.set_page_config(page_title="t検定(対応あり)", layout="wide")
 
@@ -17,37 +17,32 @@ st.write("変数の選択　→　t検定　→　表作成　→　解釈の補
 st.write("")
 
 # 分析のイメージ
-image = Image.open('ttest_rel.png')
-st.image(image)
+show_image('ttest_rel.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('ttest_rel_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('ttest_rel_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 # 変数設定の注意点
 if st.checkbox('注意点の表示（クリックで開きます）'):
-    attentionImage = Image.open('ttest_rel_attention.png')
-    st.image(attentionImage)
+    show_image('ttest_rel_attention.png')
 
 if df is not None:
     # 数値変数の抽出
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # 観測変数と測定変数の選択
     st.subheader("観測変数の選択")
@@ -83,75 +78,14 @@ if df is not None:
             st.subheader('【分析結果】')
             st.write("【要約統計量】")
             
-            # 数値変数のリスト
-            num_vars = numerical_cols
-
-            # サマリ用のデータフレームのセット
-            summaryColumns = ["有効N", "平均値", "中央値", "標準偏差", "分散",
-                              "最小値", "最大値"]
-            df_summary = pd.DataFrame(index=num_vars, columns=summaryColumns)
-
-            # サマリ用のデータフレームに平均値と標準偏差を追加
-            for var in num_vars:
-                y = df[var]
-                df_summary.at[var, '有効N'] = len(y)
-                df_summary.at[var, '平均値'] = y.mean()
-                df_summary.at[var, '中央値'] = median(y)
-                df_summary.at[var, '標準偏差'] = y.std()
-                df_summary.at[var, '分散'] = variance(y)
-                df_summary.at[var, '最小値'] = y.min()
-                df_summary.at[var, '最大値'] = y.max()
-
             # 要約統計量（サマリ）のデータフレームを表示
+            df_summary = summarize(df, pre_vars + post_vars)
             st.write(df_summary.style.format("{:.2f}"))
 
             st.write("【平均値の差の検定（対応あり）】")
-            
-            # 検定結果のデータフレームを作成
-            resultColumns = ["観測値" + "M", "観測値" + "S.D",
-                            "測定値" + "M", "測定値" + "S.D",
-                            'df', 't', 'p', 'sign', 'd']
-
-            # indexにpre → post となるようにデータフレームを記載
-            index = [f'{pre_var} → {post_var}' for pre_var, post_var in zip(pre_vars, post_vars)]
-            result_df = pd.DataFrame(index=index, columns=resultColumns)
-            paired_variable_list = [f'{pre_var} → {post_var}' for pre_var, post_var in zip(pre_vars, post_vars)]
-
-            for pre_var, post_var, idx in zip(pre_vars, post_vars, index):
-                # t値、p値、s（全体標準偏差）、d値（効果量）の取得
-                x, y = df[pre_var], df[post_var]
-                ttest = stats.ttest_rel(x, y)
-                t = abs(ttest.statistic)
-                p = ttest.pvalue
-                xs, ys = x.std(), y.std()
-                xm, ym = x.mean(), y.mean()
-                d_beta = xm - ym
-                xdf, ydf = len(x), len(y)
-                px, py = pow(xs, 2), pow(ys, 2)
-                ds = math.sqrt(((xdf * px) + (ydf * py)) / (xdf + ydf))
-                d = abs(d_beta / ds)
-
-                # p値の判定をsignに格納
-                sign = ""
-                if p < 0.01:
-                    sign = "**"
-                elif p < 0.05:
-                    sign = "*"
-                elif p < 0.1:
-                    sign = "†"
-                else:
-                    sign = "n.s."
-
-                # 従属変数の列データの計算処理
-                result_df.at[idx, '観測値M'] = xm
-                result_df.at[idx, '観測値S.D'] = xs
-                result_df.at[idx, '測定値M'] = ym
-                result_df.at[idx, '測定値S.D'] = ys
-                result_df.at[idx, 'df'] = len(x) - 1
-                result_df.at[idx, 't'] = t
-                result_df.at[idx, 'p'] = p
-                result_df.at[idx, 'sign'] = sign
-                result_df.at[idx, 'd'] = d
+            result = paired_ttest(df, pre_vars, post_vars)
+            result_df = result.table
+            paired_variable_list = result_df.index.tolist()
 
             # 結果のデータフレームを表示
             # r_numerical_cols = result_df.select_dtypes(exclude=['object', 'category']).columns.tolist()
@@ -207,17 +141,17 @@ if df is not None:
             def add_bracket(ax, x1, x2, y, text):
                 bracket_length = 4
                 # ブラケットの両端を描画
-                ax.add_line(Line2D([x1, x1], [y, y + bracket_length], color='black', lw=1))
-                ax.add_line(Line2D([x2, x2], [y, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x1, x1], [y, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x2, x2], [y, y + bracket_length], color='black', lw=1))
 
                 # ブラケットの中央部分を描画
-                ax.add_line(Line2D([x1, x2], [y + bracket_length, y + bracket_length], color='black', lw=1))
+                ax.add_line(mlines.Line2D([x1, x2], [y + bracket_length, y + bracket_length], color='black', lw=1))
 
                 # p値と判定記号を表示
                 ax.text((x1 + x2) / 2, y + bracket_length + 2, text,
                         horizontalalignment='center', verticalalignment='bottom')
 
-            for pre_var, post_var in zip(pre_vars, post_vars):
+            for (pre_var, post_var), idx in zip(result.pairs, result_df.index):
                 data = pd.DataFrame({
                     '群': [pre_var, post_var],
                     '平均値': [df[pre_var].mean(), df[post_var].mean()],
@@ -229,8 +163,7 @@ if df is not None:
                 if show_graph_title:  # チェックボックスの状態に基づいてタイトルを表示または非表示にする
                     ax.set_title(f'平均値の比較： {pre_var} → {post_var}')
 
-                ttest_result = stats.ttest_rel(df[pre_var], df[post_var])
-                p_value = ttest_result.pvalue
+                p_value = result_df.at[idx, 'p']
                 if p_value < 0.01:
                     significance_text = "p < 0.01 **"
                 elif p_value < 0.05:
@@ -1,13 +1,13 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-from scipy import stats
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-import math
-from statistics import median, variance
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-from PIL import Image
+from easy_stat.assets import show_image
+from easy_stat.engine import one_way_anova, summarize, tukey_hsd
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+from easy_stat.sketch import lumped_note
+
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
 
 st.set_page_config(page_title="一要因分散分析(対応なし)", layout="wide")
 
@@ -17,34 +17,36 @@ st.write("変数の選択　→　分散分析　→　表作成　→　解釈
 st.write("")
 
 # 分析のイメージ
-image = Image.open('anova.png')
-st.image(image)
+show_image('anova.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('anova_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('anova_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
+    # 水準の多いカテゴリ変数は、出現回数の上位の水準と「その他」にまとめて使う
+    dataset = dataset.with_top_levels()
+    df = dataset.df
+    if dataset.lumped_cols:
+        st.caption(lumped_note(dataset.lumped_cols))
+
     # カテゴリ変数の抽出
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
     # 数値変数の抽出
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # カテゴリ変数の選択
     st.subheader("カテゴリ変数の選択")
@@ -85,72 +87,15 @@ if df is not None:
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            # 数値変数の要素の数を取得
-            num_range = len(num_vars)
-
-            # 各値の初期化
-            n = 1
-            summaryList = [num_vars]
-            summaryColumns = ["有効N", "平均値", "中央値", "標準偏差", "分散",
-                            "最小値", "最大値"]
-
-            # 目的変数、従属変数から作業用データフレームのセット
-            df00_list = cat_var + num_vars
-            df00 = df[df00_list]
-
-            # サマリ(df0)用のデータフレームのセット
-            df0 = pd.DataFrame(index=summaryList, columns=summaryColumns)
-
-            # サマリ(df0)用のデータフレームに平均値と標準偏差を追加
-            for summary in range(num_range):
-                # 列データの取得（nは従属変数の配列番号）
-                y = df00.iloc[:, n]
-
-                # 従属変数の列データの計算処理
-                df0.at[df00.columns[n], '有効N'] = len(y)
-                df0.at[df00.columns[n], '平均値'] = y.mean()
-                df0.at[df00.columns[n], '中央値'] = median(y)
-                df0.at[df00.columns[n], '標準偏差'] = y.std()
-                df0.at[df00.columns[n], '分散'] = variance(y)
-                df0.at[df00.columns[n], '最小値'] = y.min()
-                df0.at[df00.columns[n], '最大値'] = y.max()
-                n += 1
-
-
             # 要約統計量（サマリ）のデータフレームを表示
+            df0 = summarize(df, num_vars)
             st.write(df0.style.format("{:.2f}"))
 
             st.write('【分散分析（対応なし）】')
-            
-            # ANOVAの実行
-            # 結果の表作成
-            columns = ['全体M', '全体S.D'] + [item for sublist in zip([f'{group}M' for group in df[cat_var[0]].unique()], [f'{group}S.D' for group in df[cat_var[0]].unique()]) for item in sublist] + \
-                    ['df', 'F', 'p', 'sign', 'η²', 'ω²']
-            df_results = pd.DataFrame(columns=columns, index=[num_var])
-            
-            for num_var in num_vars:
-                groups = [df[df[cat_var[0]] == group][num_var] for group in df[cat_var[0]].unique()]
-                overall_mean = df[num_var].mean()
-                fval, pval = stats.f_oneway(*groups)
-                anova_results = stats.f_oneway(*groups)
-                df_between = len(df[cat_var[0]].unique()) - 1
-                df_within = len(df) - len(df[cat_var[0]].unique())
-                ss_between = df_between * sum([(group.mean() - overall_mean)**2 for group in groups])
-                ss_total = sum([(value - overall_mean)**2 for group in groups for value in group])
-                ms_within = (ss_total - ss_between) / df_within
-
-                # 効果量の計算
-                eta_squared = ss_between / ss_total
-                omega_squared = (ss_between - (df_between * ms_within)) / (ss_total + ms_within)
-                
-                overall_std = df[num_var].std()
 
-                means = [group.mean() for group in groups]
-                stds = [group.std() for group in groups]
-
-                sign = '**' if pval < 0.01 else '*' if pval < 0.05 else '†' if pval < 0.1 else 'n.s.'
-
-                df_results.loc[num_var] = [overall_mean, overall_std] + means + stds + [len(df) - len(df[cat_var[0]].unique()), fval, pval, sign, eta_squared, omega_squared]  # 修正: eta_squared, omega_squaredを追加
+            # ANOVAの実行
+            result = one_way_anova(df, cat_var[0], num_vars)
+            df_results = result.table
 
             # 結果の表示
             # 数値型の列だけを選択
@@ -161,11 +106,11 @@ if df is not None:
             
             st.write("【多重比較の結果】")
 
+            # TukeyのHSDテストを実行（可視化でも同じ結果を使う）
+            tukey_results = {num_var: dataset.cached(tukey_hsd, cat_var[0], num_var) for num_var in num_vars}
+
             for num_var in num_vars:
-                # TukeyのHSDテストを実行
-                tukey_result = pairwise_tukeyhsd(df[num_var], df[cat_var[0]])
-                # 結果をデータフレームに変換
-                tukey_df = pd.DataFrame(data=tukey_result._results_table.data[1:], columns=tukey_result._results_table.data[0])
+                tukey_df = tukey_results[num_var].table
                 st.write(f'＜　　{num_var}　　に対する多重比較の結果＞')
                 st.write(tukey_df)
             
@@ -188,8 +133,8 @@ if df is not None:
             # サンプルサイズの表示
             st.write('＜サンプルサイズ＞')
             st.write(f'全体N ＝ {len(df)}')
-            for group_name in df[cat_var[0]].unique():
-                st.write(f'● {group_name}： {len(df[df[cat_var[0]] == group_name])}')
+            for group_name in result.groups:
+                st.write(f'● {group_name}： {result.group_sizes[group_name]}')
 
             st.subheader('【解釈の補助】')
 
@@ -242,13 +187,11 @@ if df is not None:
                         horizontalalignment='center', verticalalignment='bottom')
                 
             for num_var in num_vars:
-                # TukeyのHSDテストを実行
-                tukey_result = pairwise_tukeyhsd(df[num_var], df[cat_var[0]])
-                # 結果をデータフレームに変換
-                tukey_df = pd.DataFrame(data=tukey_result._results_table.data[1:], columns=tukey_result._results_table.data[0])
+                tukey_result = tukey_results[num_var]
+                tukey_df = tukey_result.table
 
-                # 群ごとの平均値と標準偏差を計算
-                groups = df.groupby(cat_var[0])
+                # 群ごとの平均値と標準偏差を計算（多重比較と同じく、値が欠損値の行は除く）
+                groups = df.dropna(subset=[num_var]).groupby(cat_var[0], observed=True)
                 means = groups[num_var].mean()
                 errors = groups[num_var].std()
 
@@ -280,11 +223,12 @@ if df is not None:
                 
                 # ブラケットと判定を追加
                 for i, (group1, group2) in enumerate(group_pairs):
-                    # tukey_df から特定のペアの p-adj 値を取得
-                    matching_row = tukey_df[((tukey_df['group1'] == group1) & (tukey_df['group2'] == group2)) | 
-                                            ((tukey_df['group1'] == group2) & (tukey_df['group2'] == group1))]
-                    p_value = matching_row['p-adj'].values[0]
-                    
+                    # 特定のペアの p-adj 値を取得
+                    p_value = tukey_result.pvalue(group1, group2)
+                    # 多重比較の結果がない組み合わせは表示しない
+                    if np.isnan(p_value):
+                        continue
+
                     if p_value < 0.01:
                         significance = '**'
                     elif p_value < 0.05:
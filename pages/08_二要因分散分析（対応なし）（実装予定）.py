@@ -1,15 +1,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
-import statsmodels.api as sm
-from statsmodels.formula.api import ols
-from statsmodels.stats.anova import anova_lm
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-from statistics import median, variance
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-from PIL import Image
+from easy_stat.assets import show_image
+from easy_stat.engine import tukey_hsd, two_way_anova
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+from easy_stat.sketch import lumped_note
+
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
 
 # Streamlitのページ設定
 st.set_page_config(page_title="二要因分散分析(対応なし)", layout="wide")
@@ -21,34 +20,36 @@ st.write("変数の選択 → 分散分析 → 表作成 → 解釈の補助を
 st.write("")
 
 # 分析のイメージ
-image = Image.open('anova.png')  # 画像のパスは適宜変更してください
-st.image(image)
+show_image('anova.png')  # 画像のパスは適宜変更してください
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('anova_demo.xlsx')  # デモデータのパスは適宜変更してください
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('anova_demo.xlsx', sheet_name=0)  # デモデータのパスは適宜変更してください
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
+    # 水準の多いカテゴリ変数は、出現回数の上位の水準と「その他」にまとめて使う
+    dataset = dataset.with_top_levels()
+    df = dataset.df
+    if dataset.lumped_cols:
+        st.caption(lumped_note(dataset.lumped_cols))
+
     # カテゴリ変数の抽出
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
     # 数値変数の抽出
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # カテゴリ変数の選択
     st.subheader("カテゴリ変数の選択")
@@ -70,13 +71,9 @@ if df is not None:
         if st.button('分散分析の実行'):
             st.subheader('【分析結果】')
 
-            # formulaの生成
-            # カテゴリ変数が日本語や特殊文字を含む場合、バッククォートで囲む
-            formula = f'Q("{num_var}") ~ C(Q("{cat_vars[0]}")) + C(Q("{cat_vars[1]}")) + C(Q("{cat_vars[0]}")):C(Q("{cat_vars[1]}"))'
             try:
-                model = ols(formula, df).fit()
-                anova_results = anova_lm(model, typ=2)
-                st.write(anova_results)
+                anova_result = two_way_anova(df, cat_vars, num_var)
+                st.write(anova_result.table)
             except Exception as e:
                 st.error(f"分析中にエラーが発生しました: {e}")
 
@@ -84,11 +81,11 @@ if df is not None:
             st.write("【多重比較の結果】")
             tukey_results = {}
             for cat in cat_vars:
-                tukey = pairwise_tukeyhsd(endog=df[num_var], groups=df[cat], alpha=0.05)
+                tukey = dataset.cached(tukey_hsd, cat, num_var)
                 tukey_results[cat] = tukey
 
-                # Tukey結果をDataFrameに変換して列名を適切なものに変更
-                tukey_df = pd.DataFrame(data=tukey._results_table.data[1:], columns=tukey._results_table.data[0])
+                # Tukey結果の列名を適切なものに変更
+                tukey_df = tukey.table.copy()
                 tukey_df.columns = ['Group1', 'Group2', 'Meandiff', 'P-adj', 'Lower', 'Upper', 'Reject']
                 tukey_df = tukey_df.rename(columns={'Group1': f'{cat}1', 'Group2': f'{cat}2'})
 
@@ -101,8 +98,8 @@ if df is not None:
             fig, ax = plt.subplots(figsize=(10, 6))
 
             # カテゴリ変数ごとにデータを集計
-            means = df.groupby(cat_vars)[num_var].mean().unstack()
-            errors = df.groupby(cat_vars)[num_var].std().unstack()
+            means = df.groupby(cat_vars, observed=True)[num_var].mean().unstack()
+            errors = df.groupby(cat_vars, observed=True)[num_var].std().unstack()
 
             # データのプロット
             means.plot(kind='bar', yerr=errors, ax=ax, capsize=5)
@@ -120,8 +117,10 @@ if df is not None:
                 for i, group1 in enumerate(unique_groups):
                     for j, group2 in enumerate(unique_groups):
                         if i < j:
-                            # 正しいインデックスでp値を取得
-                            p_value = tukey_results[cat].pvalues[unique_groups.tolist().index(group1) * len(unique_groups) + unique_groups.tolist().index(group2)]
+                            # 横軸に並ぶ群の組み合わせのみブラケットを追加
+                            if group1 not in means.index or group2 not in means.index:
+                                continue
+                            p_value = tukey_results[cat].pvalue(group1, group2)
                             if p_value < 0.05:
                                 display_text = f'p = {p_value:.3f}'
                                 add_significance_brackets(cat, group1, group2, height, display_text)
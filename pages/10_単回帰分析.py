@@ -1,11 +1,12 @@
+import numpy as np
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+from easy_stat.engine import linear_regression
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.sampling import DEFAULT_MAX_POINTS, sample_points
+from easy_stat.session import get_dataset, get_demo_dataset
 
-from sklearn.linear_model import LinearRegression
-
-
-plt.rcParams['font.family'] = 'IPAexGothic'
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
 
 st.set_page_config(page_title="単回帰分析", layout="wide")
 
@@ -17,20 +18,18 @@ st.write("説明変数と目的変数の関係を単回帰分析を使用して
 st.write("")
 
 # TODO 共通化
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=SUPPORTED_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
-input_df = None
 if use_demo_data:
      # TODO デモファイルを用意する
-     input_df = pd.read_excel('correlation_demo.xlsx', sheet_name=0)
+     dataset = get_demo_dataset('correlation_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        print(uploaded_file.type)
-        if uploaded_file.type == 'text/csv':
-            input_df = pd.read_csv(uploaded_file)
-        else:
-            input_df = pd.read_excel(uploaded_file)
+    dataset = get_dataset(uploaded_file)
+
+input_df = None
+if dataset is not None:
+    input_df = dataset.df
 
 feature_col = None
 target_col = None
@@ -38,7 +37,7 @@ if input_df is not None:
     st.subheader('元のデータ')
     st.write(input_df)
 
-    numerical_cols = input_df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # 説明変数の選択
     st.subheader("説明変数の選択")
@@ -52,6 +51,7 @@ if input_df is not None:
     st.write(f"{feature_col}から{target_col}の値を予測します。")
 
     show_graph_title = st.checkbox('グラフタイトルを表示する', value=True)  # デフォルトでチェックされている
+    max_points = st.number_input('グラフに描く点の数の上限', min_value=1_000, value=DEFAULT_MAX_POINTS, step=1_000)
 
     # 単回帰分析の実施
     if st.button('単回帰分析の実行'):
@@ -61,24 +61,29 @@ if input_df is not None:
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            feature = input_df[feature_col].to_numpy().reshape(-1, 1)
-            target = input_df[target_col]
+            result = linear_regression(input_df, [feature_col], target_col)
+            feature = result.features
+            target = input_df[target_col].to_numpy(dtype=float)
+            target_pred = result.predictions
 
-            model = LinearRegression()
-            model.fit(feature, target)
-            target_pred = model.predict(feature)
+            # 点が多い場合は、外れ値を残して抽出した点を描く
+            sample = sample_points(np.column_stack([feature, target]), int(max_points))
+            # 回帰直線は説明変数の最小値と最大値の2点を結ぶ
+            ends = [feature[:, 0].argmin(), feature[:, 0].argmax()]
 
             fig, ax = plt.subplots(figsize=(8, 6))
             if show_graph_title:
                 ax.set_title(f'{feature_col}と{target_col}の関係 - 単回帰分析')
             ax.set_xlabel(feature_col)
             ax.set_ylabel(target_col)
-            ax.scatter(feature, target, color="blue")
-            ax.plot(feature, target_pred, color="red")
+            ax.scatter(feature[sample.index], target[sample.index], color="blue")
+            ax.plot(feature[ends], target_pred[ends], color="red")
             st.pyplot(fig)
+            if sample.sampled:
+                st.caption(sample.note)
 
-            st.write(f"回帰係数: {model.coef_[0]}")
-            st.write(f"切片: {model.intercept_}")
+            st.write(f"回帰係数: {result.coef[0]}")
+            st.write(f"切片: {result.intercept}")
             st.write("")
 
 
@@ -1,40 +1,46 @@
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
 import streamlit as st
-import pandas as pd
 
-from sklearn import preprocessing
-from sklearn.linear_model import LinearRegression
+from easy_stat.engine import RegressionResult, linear_regression
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.sampling import DEFAULT_MAX_POINTS, sample_points
+from easy_stat.session import get_dataset, get_demo_dataset
 
-plt.rcParams['font.family'] = 'IPAexGothic'
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
 
 
 def plot_graph(
-    model: LinearRegression,
-    features, 
+    result: RegressionResult,
     target, 
     feature_cols: list[str], 
     target_col: str, 
-    show_graph_title: bool = False
+    show_graph_title: bool = False,
+    max_points: int = DEFAULT_MAX_POINTS
 ) -> None:
+    # 点が多い場合は、外れ値を残して抽出した点を描く
+    target = np.asarray(target, dtype=float)
+    sample = sample_points(np.column_stack([result.features, target]), max_points)
+
     fig, ax = plt.subplots(figsize=(8, 6))
     if show_graph_title:
         ax.set_title(f'{feature_cols}と{target_col}の関係 - 重回帰分析')
     
     if len(feature_cols) == 1:
+        # 回帰直線は説明変数の最小値と最大値の2点を結ぶ
+        ends = [result.features[:, 0].argmin(), result.features[:, 0].argmax()]
         ax.set_xlabel(feature_cols[0])
         ax.set_ylabel(target_col)
-        ax.scatter(features, target, color="blue")
-        ax.plot(features, target_pred, color="red")
+        ax.scatter(result.features[sample.index], target[sample.index], color="blue")
+        ax.plot(result.features[ends], result.predictions[ends], color="red")
         st.pyplot(fig)
     elif len(feature_cols) == 2:
-        x1 = features[:, 0]
-        x2 = features[:, 1]
+        x1 = result.features[:, 0]
+        x2 = result.features[:, 1]
         fig=plt.figure(figsize=(8, 6))
         ax = fig.add_subplot(projection='3d')
 
-        ax.scatter3D(x1, x2, target)
+        ax.scatter3D(x1[sample.index], x2[sample.index], target[sample.index])
         ax.set_xlabel(feature_cols[0])
         ax.set_ylabel(feature_cols[1])
         ax.set_zlabel(target_col)
@@ -42,10 +48,12 @@ def plot_graph(
         mesh_x1 = np.arange(x1.min(), x1.max(), (x1.max()-x1.min())/20)
         mesh_x2 = np.arange(x2.min(), x2.max(), (x2.max()-x2.min())/20)
         mesh_x1, mesh_x2 = np.meshgrid(mesh_x1, mesh_x2)
-        mesh_y = model.coef_[0] * mesh_x1 + model.coef_[1] * mesh_x2 + model.intercept_
+        mesh_y = result.coef[0] * mesh_x1 + result.coef[1] * mesh_x2 + result.intercept
         ax.plot_wireframe(mesh_x1, mesh_x2, mesh_y)
     
     st.pyplot(fig)
+    if sample.sampled:
+        st.caption(sample.note)
                 
 
 st.set_page_config(page_title="重回帰分析", layout="wide")
@@ -57,20 +65,18 @@ st.write("説明変数と目的変数の関係を重回帰分析を使用して
 
 st.write("")
 
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=SUPPORTED_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
-input_df = None
 if use_demo_data:
      # TODO デモファイルを用意する
-     input_df = pd.read_excel('correlation_demo.xlsx', sheet_name=0)
-#else:
-elif uploaded_file is not None:
-    print(uploaded_file.type)
-    if uploaded_file.type == 'text/csv':
-        input_df = pd.read_csv(uploaded_file)
-    else:
-        input_df = pd.read_excel(uploaded_file)
+     dataset = get_demo_dataset('correlation_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
+input_df = None
+if dataset is not None:
+    input_df = dataset.df
 
 feature_col = None
 target_col = None
@@ -78,7 +84,7 @@ if input_df is not None:
     st.subheader('元のデータ')
     st.write(input_df)
 
-    numerical_cols = input_df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    numerical_cols = dataset.numerical_cols
 
     # 説明変数の選択
     st.subheader("説明変数の選択")
@@ -93,8 +99,10 @@ if input_df is not None:
 
     is_normalizataion = st.checkbox('説明変数の標準化を行う', value=False)
 
+    max_points = DEFAULT_MAX_POINTS
     if 1 <= len(feature_cols) <= 2:
         show_graph_title = st.checkbox('グラフタイトルを表示する', value=True)  # デフォルトでチェックされている
+        max_points = st.number_input('グラフに描く点の数の上限', min_value=1_000, value=DEFAULT_MAX_POINTS, step=1_000)
 
     # 単回帰分析の実施
     if st.button('重回帰分析の実行'):
@@ -106,28 +114,18 @@ if input_df is not None:
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            features = input_df[feature_cols].to_numpy()
             target = input_df[target_col]
-
-            if is_normalizataion:
-                # 標準化
-                sscaler = preprocessing.StandardScaler()
-                sscaler.fit(features)
-                features = sscaler.transform(features)
-
-            model = LinearRegression()
-            model.fit(features, target)
-            target_pred = model.predict(features)
+            result = linear_regression(input_df, feature_cols, target_col, standardize=is_normalizataion)
 
             if len(feature_cols) <= 2:
-                plot_graph(model, features, target, feature_cols, target_col, show_graph_title)
+                plot_graph(result, target, feature_cols, target_col, show_graph_title, int(max_points))
 
             coefs_str = "編回帰係数:\n"
-            for i, coef in enumerate(model.coef_):
+            for i, coef in enumerate(result.coef):
                 coefs_str += f"- x{i} = {feature_cols[i]},  a{i} = {coef}\n"
 
             st.write(coefs_str)
-            st.write(f"切片: {model.intercept_}")
+            st.write(f"切片: {result.intercept}")
             st.write("")
 
 # Copyright
@@ -1,22 +1,20 @@
 # 必要なライブラリをインポート
 import streamlit as st
-import pandas as pd
-from fbprophet import Prophet
-from fbprophet.plot import plot_plotly
-import plotly.offline as py
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset
+
+fbprophet = lazy_import('fbprophet')
 
 # タイトルを設定
 st.title('因子分析アプリ')
 st.caption("Created by Dit-Lab.(Daiki Ito)")
 
 # CSVまたはExcelファイルのアップロード
-uploaded_file = st.file_uploader("CSVまたはExcelファイルをアップロードしてください", type=["csv", "xlsx"])
-if uploaded_file is not None:
-    # ファイルの拡張子に応じて読み込み
-    if uploaded_file.name.endswith('.csv'):
-        data = pd.read_csv(uploaded_file)
-    elif uploaded_file.name.endswith('.xlsx'):
-        data = pd.read_excel(uploaded_file)
+uploaded_file = st.file_uploader("CSVまたはExcelファイルをアップロードしてください", type=SUPPORTED_TYPES)
+dataset = get_dataset(uploaded_file)
+if dataset is not None:
+    data = dataset.df
     
     st.write(data)
 
@@ -25,7 +23,7 @@ if uploaded_file is not None:
         st.write("ファイルは 'ds' と 'y' の2つのカラムを持つ必要があります。")
     else:
         # Prophetモデルの設定と学習
-        model = Prophet()
+        model = fbprophet.Prophet()
         model.fit(data)
 
         # 未来の日付を予測するためのデータフレームを作成
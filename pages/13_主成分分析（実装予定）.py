@@ -1,12 +1,13 @@
 import math
 import streamlit as st
-import pandas as pd
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import make_column_transformer
 from sklearn.pipeline import make_pipeline
 from scipy import stats
 from PIL import Image
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset
 
 import matplotlib as mpl
 # フォントのプロパティを設定
@@ -27,15 +28,10 @@ st.write("")
 st.write("実装予定")
 
 
-def load_data(file):
-    df = pd.read_excel(file)
-    return df
-
-
 def preprocess(df):
     # Identify categorical variables
     categorical_cols = df.select_dtypes(include=['object', 'category']).columns
-    numerical_cols = df.select_dtypes(include=['int64', 'float64']).columns
+    numerical_cols = df.select_dtypes(include='number').columns
 
     # Apply one-hot encoding to categorical variables
     preprocessor = make_column_transformer(
@@ -58,10 +54,11 @@ def run_pca(df, n_components):
     return components, pca
 
 
-uploaded_file = st.file_uploader("Upload your Excel file", type=['xlsx'])
+uploaded_file = st.file_uploader("Upload your Excel file", type=SUPPORTED_TYPES)
 
-if uploaded_file is not None:
-    df = load_data(uploaded_file)
+dataset = get_dataset(uploaded_file)
+if dataset is not None:
+    df = dataset.df
     st.write(df)
 
     df_preprocessed = preprocess(df)
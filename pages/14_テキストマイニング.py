@@ -1,21 +1,19 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from wordcloud import WordCloud
-import networkx as nx
-import cufflinks as cf
-import plotly.express as px
-import plotly
-from plotly.subplots import make_subplots
 from collections import Counter
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-from PIL import Image
-import MeCab
-import nlplot
+from easy_stat.assets import show_image
+from easy_stat.lazy import lazy_import
+from easy_stat.loader import SUPPORTED_TYPES
+from easy_stat.session import get_dataset, get_demo_dataset
+
+# 重いライブラリはデータを読み込んだ後、実際に使うときに import する
+wordcloud_lib = lazy_import('wordcloud')
+px = lazy_import('plotly.express')
+plt = lazy_import('matplotlib.pyplot', requires=['japanize_matplotlib'])
+MeCab = lazy_import('MeCab')
+nlplot = lazy_import('nlplot')
 
 font_path = "ipaexg.ttf"
-plt.rcParams['font.family'] = 'IPAexGothic'
 
 st.set_page_config(page_title="テキストマイニング", layout="wide")
 
@@ -25,34 +23,30 @@ st.write("カテゴリ変数と記述変数からワードクラウドや共起
 st.write("")
 
 # 分析のイメージ
-image = Image.open('textmining.png')
-st.image(image)
+show_image('textmining.png')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=['xlsx', 'csv'])
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (Excel or CSV)', type=SUPPORTED_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+if use_demo_data:
+    dataset = get_demo_dataset('textmining_demo.xlsx')
+else:
+    dataset = get_dataset(uploaded_file)
+
 # データフレームの作成
 df = None
-if use_demo_data:
-    df = pd.read_excel('textmining_demo.xlsx', sheet_name=0)
+if dataset is not None:
+    df = dataset.df
     st.write(df.head())
-else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
 
 if df is not None:
     # カテゴリ変数の抽出
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    categorical_cols = dataset.categorical_cols
     # 記述変数の抽出
-    text_cols = df.select_dtypes(include=['object']).columns.tolist()
+    text_cols = dataset.categorical_cols
 
     # カテゴリ変数の選択
     st.subheader("カテゴリ変数の選択")
@@ -105,7 +99,7 @@ if df is not None:
     max_words = st.slider('ワードクラウドの最大単語数', 50, 200, 125, key='max_words_all')
 
     # ワードクラウドの作成と表示
-    wordcloud = WordCloud(
+    wordcloud = wordcloud_lib.WordCloud(
         width=800, height=400, 
         max_words=max_words,
         background_color='white', 
@@ -153,7 +147,7 @@ if df is not None:
 
     # カテゴリ変数で群分け
     st.subheader('カテゴリ別の分析')
-    grouped = df.groupby(selected_category)
+    grouped = df.groupby(selected_category, observed=True)
     for name, group in grouped:
         st.subheader(f'＜カテゴリ： {name}＞')
         
@@ -171,7 +165,7 @@ if df is not None:
         max_words = st.slider('ワードクラウドの最大単語数', 50, 200, 125,key=f'max_words_group_{name}')
 
         # ワードクラウドの作成と表示 (カテゴリ別)
-        wordcloud_group = WordCloud(
+        wordcloud_group = wordcloud_lib.WordCloud(
             width=800, height=400, 
             max_words=max_words,
             background_color='white', 
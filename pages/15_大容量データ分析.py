@@ -0,0 +1,97 @@
+import streamlit as st
+import pandas as pd
+from easy_stat.streaming import DEFAULT_CHUNKSIZE, infer_schema, summarize_csv
+
+st.set_page_config(page_title="大容量データ分析", layout="wide")
+
+st.title("大容量データ分析")
+st.caption("Created by Dit-Lab.(Daiki Ito)")
+st.write("大きなCSVファイルを分割して読み込み、１回の読み込みで相関分析・t検定・分散分析・カイ２乗検定に必要な集計を行います")
+st.write("")
+
+# ファイルアップローダー
+uploaded_file = st.file_uploader('ファイルをアップロードしてください (CSV)', type=['csv'])
+
+if uploaded_file is not None:
+    uploaded_file.seek(0)
+    categorical_cols, numerical_cols = infer_schema(uploaded_file)
+
+    # 変数の選択（集計は１回の読み込みで行うため、事前に選択する）
+    st.subheader("数値変数の選択")
+    num_vars = st.multiselect('数値変数を選択してください', numerical_cols, default=numerical_cols)
+
+    st.subheader("カテゴリ変数の選択")
+    group_var = st.multiselect('群分けに使うカテゴリ変数（t検定・分散分析）を選択してください', categorical_cols, max_selections=1)
+    chi_vars = st.multiselect('カイ２乗検定に使うカテゴリ変数を２つ選択してください', categorical_cols, max_selections=2)
+
+    chunksize = st.number_input('１回に読み込む行数', min_value=1_000, value=DEFAULT_CHUNKSIZE, step=10_000)
+
+    if not num_vars:
+        st.error("数値変数を選択してください。")
+    elif st.button('集計の実行'):
+        uploaded_file.seek(0)
+        with st.spinner('集計しています...'):
+            st.session_state['stream_summary'] = summarize_csv(
+                uploaded_file,
+                num_vars,
+                sorted(set(group_var + chi_vars), key=categorical_cols.index),
+                group_cols=group_var,
+                pairs=[tuple(chi_vars)] if len(chi_vars) == 2 else [],
+                chunksize=int(chunksize),
+            )
+            st.session_state['stream_summary_file'] = uploaded_file.file_id
+
+    summary = st.session_state.get('stream_summary')
+    if summary is not None and st.session_state.get('stream_summary_file') == uploaded_file.file_id:
+        st.subheader('【分析結果】')
+        st.write(f'全体N ＝ {summary.rows}')
+
+        st.write('【要約統計量】')
+        st.write(summary.profile.to_frame())
+        st.caption('count・mean・std・min・max は厳密な値、unique・freq・分位点（25%・50%・75%）は'
+                   '読み込みながらスケッチで計算した近似値です。')
+        st.write('＜近似値の誤差の目安＞')
+        st.write(summary.profile.error_bounds())
+        st.caption('分位点の範囲は順位の誤差を考慮した値の範囲（99%）、ユニーク数は相対誤差（標準誤差）、'
+                   'freq は真の度数との差の上限です。')
+
+        if len(summary.numerical_cols) >= 2:
+            st.write('【相関分析】')
+            n = summary.covariance.n
+            st.caption(f'変数の組ごとに、両方が欠損値でない {n.min():.0f}〜{n.max():.0f} 行から計算しています')
+            st.dataframe(summary.covariance.corr())
+            st.write('＜p値＞')
+            st.dataframe(summary.covariance.corr_pvalues().style.format("{:.3f}"))
+
+        for col, grouped in summary.grouped.items():
+            levels = sorted(grouped.levels)
+            if len(levels) == 2:
+                st.write(f'【平均値の差の検定（対応なし）： {col}】')
+                results = grouped.welch_ttest(*levels)
+            elif len(levels) >= 3:
+                st.write(f'【分散分析（対応なし）： {col}】')
+                results = grouped.anova()
+            else:
+                st.error(f"{col}が１群しかないため、分析を実行できません")
+                continue
+            results['sign'] = pd.cut(results['p'], [-1, 0.01, 0.05, 0.1, 1.1], labels=['**', '*', '†', 'n.s.'], right=False)
+            st.write(results.style.format({c: "{:.2f}" for c in results.columns if c != 'sign'}))
+            for level in levels:
+                st.write(f'● {level}： {int(grouped.groups[level].n.max())}')
+
+        for (col1, col2), contingency in summary.contingency.items():
+            st.write(f'【カイ２乗検定： 【{col1}】 × 【{col2}】】')
+            st.write(contingency.crosstab())
+            chi2, p_value, dof, expected = contingency.chi2()
+            st.write(f'カイ二乗統計量: {chi2:.2f}')
+            st.write(f'P値: {p_value:.2f}')
+
+st.write('ご意見・ご要望は→', 'https://forms.gle/G5sMYm7dNpz2FQtU9', 'まで')
+# Copyright
+st.subheader('© 2022-2024 Dit-Lab.(Daiki Ito). All Rights Reserved.')
+st.write("easyStat: Open Source for Ubiquitous Statistics")
+st.write("Democratizing data, everywhere.")
+st.write("")
+st.subheader("In collaboration with our esteemed contributors:")
+st.write("・Toshiyuki")
+st.write("With heartfelt appreciation for their dedication and support.")
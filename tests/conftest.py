@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# アプリと同じく、リポジトリのルートから easy_stat を import できるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from easy_stat.cube import GroupCube
+from easy_stat.engine import welch_ttest, welch_ttest_moments
+
+
+@pytest.fixture
+def cube_df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        '学年': rng.choice(['1年', '2年', '3年'], 1_000),
+        '性別': pd.Categorical(rng.choice(['男', '女', '未回答'], 1_000), categories=['男', '女', '未回答', '不明']),
+        '部活動': rng.choice(['運動部', '文化部'], 1_000),
+        '得点': rng.normal(60, 10, 1_000),
+        '大きな値': rng.normal(1e8, 1, 1_000),
+    })
+    df.loc[::13, '得点'] = np.nan
+    df.loc[::17, '学年'] = None
+    # 1つの水準は値がすべて欠損値
+    df.loc[df['部活動'] == '文化部', '大きな値'] = np.nan
+    return df
+
+
+@pytest.fixture
+def cube(cube_df):
+    return GroupCube(cube_df, ['学年', '性別', '部活動'], ['得点', '大きな値'])
+
+
+@pytest.mark.parametrize('cols', [('学年', '性別'), ('性別', '学年'), ('部活動', '学年')])
+def test_crosstab_matches_pandas(cube_df, cube, cols):
+    expected = pd.crosstab(cube_df[cols[0]], cube_df[cols[1]])
+    table = cube.crosstab(*cols)
+    np.testing.assert_array_equal(table.to_numpy(), expected.to_numpy())
+    assert table.index.tolist() == expected.index.tolist()
+    assert table.columns.tolist() == expected.columns.tolist()
+
+
+@pytest.mark.parametrize('cols', [['学年'], ['部活動'], ['学年', '性別'], ['性別', '部活動']])
+@pytest.mark.parametrize('num_col', ['得点', '大きな値'])
+def test_summary_matches_groupby(cube_df, cube, cols, num_col):
+    expected = cube_df.groupby(cols, observed=True)[num_col].agg(['count', 'mean', 'std'])
+    table = cube.summary(cols, num_col)
+    assert table.index.tolist() == expected.index.tolist()
+    np.testing.assert_array_equal(table['有効N'], expected['count'])
+    np.testing.assert_allclose(table['平均値'], expected['mean'], rtol=1e-14)
+    np.testing.assert_allclose(table['標準偏差'], expected['std'], rtol=1e-8)
+
+
+def test_grouped_moments_matches_groupby(cube_df, cube):
+    grouped = cube.grouped_moments('学年')
+    expected = cube_df.groupby('学年')[['得点', '大きな値']]
+    for level, moments in grouped.groups.items():
+        np.testing.assert_array_equal(moments.n, expected.count().loc[level])
+        np.testing.assert_allclose(moments.mean, expected.mean().loc[level], rtol=1e-14)
+        np.testing.assert_allclose(moments.var, expected.var().loc[level], rtol=1e-8)
+
+
+def test_summary_accepts_non_string_labels():
+    df = pd.DataFrame({0: ['a', 'b', 'a', 'b'], 1: [1.0, 2.0, 3.0, 5.0]})
+    table = GroupCube(df, [0], [1]).summary([0], 1)
+    assert table.index.tolist() == ['a', 'b']
+    np.testing.assert_allclose(table['平均値'], [2.0, 3.5])
+
+
+def test_welch_ttest_moments_matches_welch_ttest(cube_df, cube):
+    data = cube_df.dropna(subset=['学年'])
+    data = data[data['学年'] != '3年']
+    groups = data['学年'].unique().tolist()
+    expected = welch_ttest(data, '学年', ['得点', '大きな値'])
+    result = welch_ttest_moments(cube.grouped_moments('学年', ['得点', '大きな値']), groups,
+                                 cube.level_counts('学年'))
+    assert result.groups == expected.groups
+    assert result.group_sizes == expected.group_sizes
+    pd.testing.assert_frame_equal(result.table, expected.table, check_dtype=False, rtol=1e-7)
+
+
+def test_keys_are_built_only_when_used(cube):
+    assert not cube._cells and not cube._stats
+    cube.crosstab('学年', '性別')
+    cube.crosstab('性別', '学年')
+    # 逆順の組み合わせは同じ集計を使う
+    assert list(cube._cells) == [('学年', '性別')]
+    assert not cube._stats
+    cube.summary(['部活動'], '得点')
+    assert list(cube._stats) == [(('部活動',), '得点')]
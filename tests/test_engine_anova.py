@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.stats.multicomp import pairwise_tukeyhsd
+
+from easy_stat.engine import one_way_anova, tukey_hsd
+
+
+@pytest.fixture
+def anova_df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        '組': rng.choice(['A組', 'B組', 'C組', 'D組'], 300),
+        '得点': rng.normal(60, 15, 300),
+        '大きな値': rng.normal(1e8, 1, 300),
+    })
+    df['得点'] += df['組'].map({'A組': 0, 'B組': 5, 'C組': -3, 'D組': 8})
+    df.loc[::11, '得点'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('col', ['得点', '大きな値'])
+def test_one_way_anova_matches_scipy(anova_df, col):
+    result = one_way_anova(anova_df, '組', [col])
+    samples = [anova_df.loc[anova_df['組'] == group, col].dropna() for group in result.groups]
+    expected = stats.f_oneway(*samples)
+    row = result.table.loc[col]
+    assert row['F'] == pytest.approx(expected.statistic, rel=1e-8)
+    assert row['p'] == pytest.approx(expected.pvalue, rel=1e-8, abs=1e-300)
+    for group, sample in zip(result.groups, samples):
+        assert row[f'{group}M'] == pytest.approx(sample.mean(), rel=1e-12)
+        assert row[f'{group}S.D'] == pytest.approx(sample.std(), rel=1e-8)
+
+
+def test_tukey_hsd_matches_statsmodels(anova_df):
+    data = anova_df.dropna(subset=['得点'])
+    expected = pairwise_tukeyhsd(data['得点'], data['組']).summary()
+    expected = pd.DataFrame(expected.data[1:], columns=expected.data[0])
+    result = tukey_hsd(anova_df, '組', '得点')
+    assert result.table[['group1', 'group2']].values.tolist() == expected[['group1', 'group2']].values.tolist()
+    for col in ['meandiff', 'p-adj', 'lower', 'upper']:
+        np.testing.assert_allclose(result.table[col].astype(float), expected[col].astype(float), atol=2e-4)
+    assert result.table['reject'].tolist() == expected['reject'].astype(bool).tolist()
+
+
+def test_tukey_pvalue_is_nan_for_groups_without_values(anova_df):
+    anova_df.loc[anova_df['組'] == 'D組', '得点'] = np.nan
+    result = tukey_hsd(anova_df, '組', '得点')
+    assert result.pvalue('A組', 'B組') == result.pvalue('B組', 'A組')
+    assert np.isnan(result.pvalue('A組', 'D組'))
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from easy_stat.engine import chi_square, chi_square_exact, chi_square_screening, chisquare
+from easy_stat.engine.chisquare import PARALLEL_MIN_SIMULATIONS
+
+
+@pytest.fixture
+def category_df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        '性別': rng.choice(['男', '女'], 500),
+        '血液型': rng.choice(['A', 'B', 'O', 'AB'], 500),
+        '学年': rng.choice(['1年', '2年', '3年'], 500),
+    })
+    df.loc[::13, '学年'] = None
+    return df
+
+
+def test_chi_square_matches_scipy(category_df):
+    result = chi_square(category_df, '血液型', '学年')
+    observed = pd.crosstab(category_df['血液型'], category_df['学年'])
+    chi2, p_value, dof, expected = stats.chi2_contingency(observed)
+    assert result.chi2 == pytest.approx(chi2)
+    assert result.p_value == pytest.approx(p_value)
+    assert result.dof == dof
+    np.testing.assert_allclose(result.expected.to_numpy(), expected)
+
+
+def test_chi_square_screening_matches_scipy(category_df):
+    table = chi_square_screening(category_df, ['性別', '血液型', '学年'])
+    assert len(table) == 3
+    for _, row in table.iterrows():
+        chi2, p_value, dof, _ = stats.chi2_contingency(pd.crosstab(category_df[row['変数1']], category_df[row['変数2']]))
+        assert row['χ²'] == pytest.approx(chi2)
+        assert row['p'] == pytest.approx(p_value)
+        assert row['自由度'] == dof
+
+
+def test_chi_square_exact_uses_fisher_for_2x2():
+    observed = np.array([[8, 2], [1, 5]])
+    result = chi_square_exact(observed)
+    assert result.p_value == pytest.approx(stats.fisher_exact(observed)[1])
+
+
+def test_chi_square_exact_monte_carlo_is_close_to_asymptotic():
+    observed = np.array([[30, 25, 45], [35, 40, 25]])
+    expected_p = stats.chi2_contingency(observed)[1]
+    result = chi_square_exact(observed, n_simulations=20_000, seed=0)
+    assert abs(result.p_value - expected_p) < 4 * result.std_error + 0.005
+    # 同じ seed では同じ結果になる
+    assert chi_square_exact(observed, n_simulations=20_000, seed=0).p_value == result.p_value
+
+
+def test_chi_square_exact_pool_gives_same_p_value():
+    observed = np.array([[3, 1, 4], [1, 5, 9], [2, 6, 5]])
+    n_simulations = PARALLEL_MIN_SIMULATIONS
+    batch_size = n_simulations // 4
+    in_process = chi_square_exact(observed, n_simulations, seed=0, workers=1, batch_size=batch_size)
+    pooled = chi_square_exact(observed, n_simulations, seed=0, workers=2, batch_size=batch_size)
+    # バッチごとにシードを分けるため、プロセスに分けても同じ p 値になる
+    assert pooled.p_value == in_process.p_value
+    assert pooled.n_simulations == n_simulations
+
+
+def test_chi_square_exact_batch_size_follows_total_count(monkeypatch):
+    observed = np.array([[400, 300, 300], [350, 350, 300]])
+    batches = []
+    original = chisquare._simulate_chi2
+
+    def record(*args):
+        batches.extend(size for size, _ in args[-1])
+        return original(*args)
+
+    monkeypatch.setattr(chisquare, '_simulate_chi2', record)
+    chi_square_exact(observed, 10_000, seed=0)
+    assert sum(batches) == 10_000
+    assert max(batches) * observed.sum() <= chisquare.SIMULATION_BATCH_ELEMENTS
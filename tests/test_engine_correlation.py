@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from easy_stat.engine import correlation
+
+
+@pytest.fixture
+def numeric_df():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(300, 5)) @ rng.normal(size=(5, 5))
+    df = pd.DataFrame(values, columns=list('abcde'))
+    df['e'] = df['e'].round()
+    return df
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_matches_pandas(numeric_df, method):
+    result = correlation(numeric_df, list(numeric_df), method)
+    np.testing.assert_allclose(result.matrix, numeric_df.corr(method=method), atol=1e-12)
+    assert (result.n.to_numpy() == len(numeric_df)).all()
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_with_missing_values_matches_pairwise_pandas(numeric_df, method):
+    rng = np.random.default_rng(1)
+    df = numeric_df.mask(rng.random(numeric_df.shape) < 0.15)
+    result = correlation(df, list(df), method)
+    np.testing.assert_allclose(result.matrix, df.corr(method=method), atol=1e-12)
+    valid = df.notna().astype(int)
+    np.testing.assert_array_equal(result.n, valid.T @ valid)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_pvalues_match_scipy(numeric_df, method):
+    df = numeric_df.copy()
+    df.loc[::6, 'b'] = np.nan
+    result = correlation(df, ['a', 'b'], method)
+    data = df[['a', 'b']].dropna()
+    test = stats.pearsonr if method == 'pearson' else stats.spearmanr
+    r, p = test(data['a'], data['b'])
+    assert result.matrix.loc['a', 'b'] == pytest.approx(r, abs=1e-12)
+    assert result.pvalues.loc['a', 'b'] == pytest.approx(p, rel=1e-8)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+def test_correlation_diagonal_is_nan_for_constant_column(numeric_df, method):
+    numeric_df['定数'] = 1.0
+    result = correlation(numeric_df, list(numeric_df), method)
+    expected = numeric_df.corr(method=method)
+    assert np.isnan(result.matrix.loc['定数', '定数'])
+    assert result.matrix.loc['a', 'a'] == 1.0
+    np.testing.assert_array_equal(result.matrix.isna(), expected.isna())
+
+
+def test_correlation_float32(numeric_df):
+    result = correlation(numeric_df, list(numeric_df), dtype=np.float32)
+    np.testing.assert_allclose(result.matrix, numeric_df.corr(), atol=1e-5)
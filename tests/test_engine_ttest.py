@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from easy_stat.engine import paired_ttest, welch_ttest
+
+
+@pytest.fixture
+def groups_df():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        '群': rng.choice(['A', 'B'], 200),
+        'x': rng.normal(50, 10, 200),
+        'y': rng.normal(1e6, 1, 200),
+    })
+    df.loc[::9, 'x'] = np.nan
+    return df
+
+
+def test_welch_ttest_matches_scipy(groups_df):
+    result = welch_ttest(groups_df, '群', ['x', 'y'])
+    group0, group1 = result.groups
+    for col in ['x', 'y']:
+        a = groups_df.loc[groups_df['群'] == group0, col].dropna()
+        b = groups_df.loc[groups_df['群'] == group1, col].dropna()
+        expected = stats.ttest_ind(a, b, equal_var=False)
+        row = result.table.loc[col]
+        # 平均値が 1e6 の列は、平均値の差そのものの丸め誤差が 1e-9 程度になる
+        assert row['t'] == pytest.approx(abs(expected.statistic), rel=1e-7)
+        assert row['p'] == pytest.approx(expected.pvalue, rel=1e-7)
+        assert row[f'{group0}M'] == pytest.approx(a.mean())
+        assert row[f'{group1}S.D'] == pytest.approx(b.std())
+
+
+def test_welch_ttest_requires_two_groups(groups_df):
+    groups_df.loc[:10, '群'] = 'C'
+    with pytest.raises(ValueError):
+        welch_ttest(groups_df, '群', ['x'])
+
+
+def test_paired_ttest_matches_scipy():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(size=(100, 4)), columns=['pre1', 'pre2', 'post1', 'post2'])
+    df['post1'] += 0.3
+    df.loc[::7, 'pre2'] = np.nan
+    result = paired_ttest(df, ['pre1', 'pre2'], ['post1', 'post2'])
+    for (pre, post), (_, row) in zip(result.pairs, result.table.iterrows()):
+        data = df[[pre, post]].dropna()
+        expected = stats.ttest_rel(data[pre], data[post])
+        assert row['t'] == pytest.approx(abs(expected.statistic), rel=1e-9)
+        assert row['p'] == pytest.approx(expected.pvalue, rel=1e-9)
+        assert row['df'] == len(data) - 1
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from easy_stat.sketch import (OTHER_LABEL, QUANTILES, DistinctCountSketch, Profile, QuantileSketch, TopValuesSketch,
+                              lump_frame)
+
+
+def _true_rank(values, x):
+    """x 以下の値の割合"""
+    return np.searchsorted(np.sort(values), x, side='right') / len(values)
+
+
+@pytest.mark.parametrize('distribution', ['normal', 'lognormal', 'integers'])
+def test_quantile_sketch_rank_error_is_within_bound(distribution):
+    rng = np.random.default_rng(0)
+    values = {
+        'normal': rng.normal(size=200_000),
+        'lognormal': rng.lognormal(size=200_000),
+        'integers': rng.integers(0, 50, 200_000).astype(float),
+    }[distribution]
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 17):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    assert 0 < sketch.rank_error < 0.02
+    q = np.linspace(0.01, 0.99, 99)
+    estimates = sketch.quantile(q)
+    # 推定値の真の順位は、同順位の値の範囲を含めて q ± rank_error に入る
+    below = np.searchsorted(np.sort(values), estimates, side='left') / len(values)
+    above = _true_rank(values, estimates)
+    assert (above >= q - sketch.rank_error).all()
+    assert (below <= q + sketch.rank_error).all()
+
+
+def test_quantile_sketch_merge_keeps_rank_error_bound():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(i, 1, 30_000) for i in range(6)]
+    sketches = []
+    for part in parts:
+        sketch = QuantileSketch(seed=len(sketches))
+        sketch.update(part)
+        sketches.append(sketch)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    values = np.concatenate(parts)
+    assert merged.n == len(values)
+    estimates = merged.quantile(QUANTILES)
+    assert np.abs(_true_rank(values, estimates) - np.array(QUANTILES)).max() <= merged.rank_error
+    lower, upper = merged.quantile_bounds(QUANTILES)
+    np.testing.assert_array_less(lower, np.quantile(values, QUANTILES))
+    np.testing.assert_array_less(np.quantile(values, QUANTILES), upper)
+
+
+def test_quantile_sketch_is_exact_before_compression():
+    values = np.arange(100.0)
+    sketch = QuantileSketch()
+    sketch.update(values)
+    assert sketch.rank_error == 0
+    assert sketch.quantile(0.5) == 49.0
+
+
+@pytest.mark.parametrize('n_distinct', [100, 5_000, 300_000])
+def test_distinct_count_sketch_is_within_relative_error(n_distinct):
+    rng = np.random.default_rng(2)
+    values = pd.Series(rng.permutation(n_distinct)).astype(str)
+    sketch = DistinctCountSketch()
+    for start in range(0, n_distinct, 50_000):
+        chunk = values.iloc[start:start + 50_000]
+        sketch.update(pd.concat([chunk, chunk.head(50)]))
+    # 標準誤差の4倍（正規近似で 99.99%）
+    assert abs(sketch.estimate() / n_distinct - 1) < 4 * sketch.relative_error
+
+
+def test_distinct_count_sketch_merge_equals_single_pass():
+    values = pd.Series(np.arange(50_000)).astype(str)
+    single = DistinctCountSketch()
+    single.update(values)
+    first, second = DistinctCountSketch(), DistinctCountSketch()
+    first.update(values[:30_000])
+    second.update(values[20_000:])
+    assert first.merge(second).estimate() == single.estimate()
+
+
+def test_top_values_sketch_bounds_contain_true_counts():
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.zipf(1.5, 100_000) % 5_000).astype(str)
+    sketch = TopValuesSketch(capacity=200)
+    for start in range(0, len(values), 10_000):
+        sketch.update(values.iloc[start:start + 10_000])
+    true_counts = values.value_counts()
+    top = sketch.top(20)
+    assert (top['下限'] <= true_counts[top.index]).all()
+    assert (true_counts[top.index] <= top['上限']).all()
+    # 真の上位の値は記録されている
+    assert set(true_counts.index[:10]) <= set(sketch.top().index)
+    assert (top['上限'] - top['下限']).max() <= sketch.max_error
+
+
+def test_profile_matches_describe_for_exact_columns():
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({'x': rng.normal(size=1_000), 'c': rng.choice(['a', 'b', 'c'], 1_000)})
+    df.loc[::10, 'x'] = np.nan
+    profile = Profile(['x'], ['c'])
+    for start in range(0, len(df), 300):
+        profile.update(df.iloc[start:start + 300])
+    table = profile.to_frame()
+    expected = df.describe(include='all').transpose()
+    for col in ['count', 'mean', 'std', 'min', 'max']:
+        assert table.loc['x', col] == pytest.approx(expected.loc['x', col])
+    for col in ['count', 'unique', 'top', 'freq']:
+        assert table.loc['c', col] == expected.loc['c', col]
+
+
+def test_lump_frame_accepts_non_string_column_names():
+    df = pd.DataFrame({0: [f'水準{i % 5}' for i in range(100)], 1: ['a', 'b'] * 50})
+    out, lumped = lump_frame(df, [0, 1], k=3)
+    assert lumped == [0]
+    assert out[0].nunique() == 4 and (out[0] == OTHER_LABEL).sum() == 40
+    assert out[1].equals(df[1])
+    # 元のデータフレームは変更しない
+    assert df[0].nunique() == 5
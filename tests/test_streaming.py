@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from easy_stat.engine import correlation
+from easy_stat.streaming import Covariance, Moments, covariance_csv, summarize_csv
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(5_000, 4)) @ rng.normal(size=(4, 4)) + 1e6
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return values
+
+
+def test_moments_merge_matches_single_pass(values):
+    single = Moments(list('abcd'))
+    single.update(values)
+    merged = Moments(list('abcd'))
+    for chunk in np.array_split(values, 9):
+        part = Moments(list('abcd'))
+        part.update(chunk)
+        merged.merge(part)
+    np.testing.assert_array_equal(merged.n, single.n)
+    np.testing.assert_allclose(merged.mean, single.mean, rtol=1e-14)
+    np.testing.assert_allclose(merged.var, single.var, rtol=1e-9)
+    np.testing.assert_array_equal(merged.min, single.min)
+    expected = pd.DataFrame(values, columns=list('abcd'))
+    np.testing.assert_allclose(merged.var, expected.var(), rtol=1e-9)
+
+
+def test_covariance_merge_matches_single_pass(values):
+    single = Covariance(list('abcd'))
+    single.update(values)
+    merged = Covariance(list('abcd'))
+    for chunk in np.array_split(values, 9):
+        part = Covariance(list('abcd'))
+        part.update(chunk)
+        merged.merge(part)
+    np.testing.assert_array_equal(merged.n, single.n)
+    np.testing.assert_allclose(merged.cov(), single.cov(), rtol=1e-9)
+    np.testing.assert_allclose(merged.corr(), single.corr(), atol=1e-12)
+
+
+def test_covariance_is_pairwise_complete(values):
+    df = pd.DataFrame(values, columns=list('abcd'))
+    df['e'] = 2.0
+    covariance = Covariance(df.columns)
+    for chunk in np.array_split(df.to_numpy(), 7):
+        covariance.update(chunk)
+    np.testing.assert_allclose(covariance.cov(), df.cov(), rtol=1e-8, atol=1e-12)
+    np.testing.assert_allclose(covariance.corr(), df.corr(), atol=1e-10)
+    # engine.correlation と同じ結果（N・p 値も組み合わせごと）
+    result = covariance.to_result()
+    expected = correlation(df, list(df))
+    np.testing.assert_array_equal(result.n, expected.n)
+    np.testing.assert_allclose(result.matrix, expected.matrix, atol=1e-10)
+    np.testing.assert_allclose(result.pvalues, expected.pvalues, atol=1e-10)
+
+
+def test_csv_readers_match_in_memory_results(tmp_path, values):
+    df = pd.DataFrame(values, columns=list('abcd'))
+    df['群'] = np.where(np.arange(len(df)) % 3 == 0, 'A', 'B')
+    path = tmp_path / 'data.csv'
+    df.to_csv(path, index=False)
+    for workers in (1, 3):
+        covariance = covariance_csv(str(path), list('abcd'), chunksize=700, workers=workers)
+        np.testing.assert_allclose(covariance.corr(), df[list('abcd')].corr(), atol=1e-10)
+    summary = summarize_csv(str(path), list('abcd'), ['群'], group_cols=['群'], chunksize=700)
+    assert summary.rows == len(df)
+    np.testing.assert_allclose(summary.moments.mean, df[list('abcd')].mean(), rtol=1e-14)
+    moments = summary.grouped['群'].groups['A']
+    np.testing.assert_allclose(moments.var, df.loc[df['群'] == 'A', list('abcd')].var(), rtol=1e-9)